@@ -0,0 +1,225 @@
+import contextlib
+import glob
+import io
+import json
+import logging
+import os
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Union
+
+import cache
+import config
+import create
+import staging
+import tracing
+from resume import model
+
+LOG_FORMAT = "%(levelname)s - %(asctime)s - %(message)s"
+LOG_DATEFMT = "%d-%b-%y %H:%M:%S"
+
+
+class JobResult(NamedTuple):
+    path: str
+    output_filename: str
+    ok: bool
+    log_path: Optional[str] = None
+    cached: bool = False
+    trace: List[dict] = []
+    errors: List[str] = []  # LaTeX errors, file:line: message
+
+
+def collect_resume_paths(pattern: Union[str, Path]) -> List[Path]:
+    """resume files in a directory (*.jsonc, *.json) or matching a glob pattern"""
+    path = Path(pattern)
+    if path.is_dir():
+        paths = [*path.glob("*.jsonc"), *path.glob("*.json")]
+    else:
+        paths = [Path(item) for item in glob.glob(str(pattern), recursive=True)]
+
+    return sorted(item for item in paths if item.is_file())
+
+
+def batch_root(pattern: Union[str, Path]) -> Path:
+    """directory a batch pattern is relative to, the directory itself or the
+    part of a glob pattern before the first wildcard"""
+    path = Path(pattern)
+    if path.is_dir():
+        return path
+
+    parts = []
+    for part in path.parent.parts:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return Path(*parts) if parts else Path(".")
+
+
+def common_root(paths: List[Path]) -> Path:
+    """deepest directory containing all of `paths`"""
+    return Path(os.path.commonpath([path.parent for path in paths])) if paths else Path(".")
+
+
+def get_output_filenames(
+    paths: List[Path], root: Union[str, Path, None] = None
+) -> Dict[Path, str]:
+    """output name of every resume of a batch, its path relative to `root`
+    without suffix and with `-` for separators, `root/a/resume.jsonc` ->
+    `a-resume`. Raises ValueError if two resumes get the same name or one gets
+    a reserved name, before anything is built"""
+    root = common_root(paths) if root is None else root
+    names: Dict[Path, str] = {}
+    by_name: Dict[str, List[Path]] = {}
+    for path in paths:
+        relative = Path(os.path.relpath(path, root)).with_suffix("")
+        name = "-".join(part for part in relative.parts if part not in (".", ".."))
+        names[path] = name
+        by_name.setdefault(name, []).append(path)
+
+    for name, items in by_name.items():
+        try:
+            create.check_output_filename(name)
+        except ValueError as e:
+            raise ValueError(f"{', '.join(map(str, items))}: {e}") from None
+
+    duplicates = {name: items for name, items in by_name.items() if len(items) > 1}
+    if duplicates:
+        raise ValueError(
+            "resumes with the same output name: "
+            + "; ".join(
+                f"{name}: {', '.join(map(str, items))}" for name, items in duplicates.items()
+            )
+        )
+    return names
+
+
+def init_worker(config_overrides: Optional[dict] = None):
+    """apply cli config overrides and drop inherited console handlers,
+    job output is captured per job in run_job"""
+    for name, value in (config_overrides or {}).items():
+        setattr(config, name, value)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(config.LOG_LEVEL)
+
+
+def run_job(
+    path: Union[str, Path], output_filename: str, data: Optional[dict] = None
+) -> JobResult:
+    """build a single resume, capturing its log output and writing it to
+    `config.BATCH_LOG_DIR` if the build fails. `data` is an already parsed
+    document (streamed input), `path` then only names it in the logs"""
+    buffer = io.StringIO()
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+
+    result = create.BuildResult(False)
+    hits_before = cache.get_build_cache().hits
+    try:
+        with contextlib.redirect_stdout(buffer), tracing.span("job", path=str(path)):
+            if data is None:
+                data = create.load_resume(Path(path))
+            else:
+                with tracing.span("validate"):
+                    data = model.validate(data).to_dict()
+            result = create.create_resume_(data, output_filename)
+
+    except json.JSONDecodeError as e:
+        logging.error(f"invalid json {path}: {e}")
+
+    except model.ValidationError as e:
+        logging.error(f"invalid resume {path}: {e}")
+
+    except Exception:
+        logging.error(f"build failed for {path}:\n" + traceback.format_exc())
+
+    finally:
+        root.removeHandler(handler)
+
+    if result.ok:
+        cached = cache.get_build_cache().hits > hits_before
+        return JobResult(
+            str(path), output_filename, True, cached=cached, trace=tracing.drain()
+        )
+
+    log_path = config.BATCH_LOG_DIR.joinpath(f"{output_filename}.log")
+    staging.publish_text(buffer.getvalue(), log_path)
+
+    return JobResult(
+        str(path),
+        output_filename,
+        False,
+        str(log_path),
+        trace=tracing.drain(),
+        errors=[str(error) for error in result.errors],
+    )
+
+
+def build_batch(
+    paths: List[Path],
+    jobs: int = config.BATCH_JOBS,
+    config_overrides: Optional[dict] = None,
+    root: Union[str, Path, None] = None,
+) -> List[JobResult]:
+    """build all resumes in `paths` on a pool of `jobs` processes, a failing
+    job does not stop the rest of the batch. Output names are relative to
+    `root`, see get_output_filenames"""
+    if not paths:
+        logging.warning("no resume files found for batch")
+        return []
+
+    output_filenames = get_output_filenames(paths, root)
+    logging.info(f"building {len(paths)} resumes with {jobs} workers")
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=init_worker, initargs=(config_overrides,)
+    ) as executor:
+        futures = {
+            executor.submit(run_job, path, output_filenames[path]): path for path in paths
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+            results.append(collect_result(future, path, output_filenames[path]))
+
+    log_summary(results)
+    return results
+
+
+def collect_result(
+    future: Future, path: Union[str, Path], output_filename: Optional[str] = None
+) -> JobResult:
+    """result of a finished run_job future, logged and its trace merged"""
+    try:
+        result = future.result()
+
+    except Exception as e:  # worker process died
+        output_filename = output_filename or create.get_output_filename(path)
+        result = JobResult(str(path), output_filename, False)
+        logging.error(f"worker failed for {path}: {e!r}")
+
+    if result.ok:
+        status = "cached" if result.cached else "ok"
+        logging.info(f"[{status}] {result.path} -> out/{result.output_filename}.pdf")
+    else:
+        first_error = f", {result.errors[0]}" if result.errors else ""
+        logging.error(f"[failed] {result.path}{first_error}, log: {result.log_path}")
+
+    tracing.events.extend(result.trace)
+    return result
+
+
+def log_summary(results: List[JobResult], skipped: int = 0) -> None:
+    failed = sum(1 for result in results if not result.ok)
+    cached = sum(1 for result in results if result.cached)
+    done = f", {skipped} already done" if skipped else ""
+    logging.info(
+        f"batch finished: {len(results) - failed} built ({cached} from cache), {failed} failed"
+        + done
+    )
@@ -0,0 +1,92 @@
+"""import time budget of the CLI, measured with `python -X importtime`
+
+Fails (exit code 1) if importing `create` takes longer than the budget or
+pulls in a module that should only be imported when it is used.
+
+    python3 script/benchmarks/importtime.py
+    python3 script/benchmarks/importtime.py --budget-ms 80 --top 15
+
+Run from the repository root.
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+SCRIPT_DIR = Path(__file__).resolve().parents[1]
+
+DEFAULT_BUDGET_MS = 80.0
+# heavy or rarely needed modules, imported lazily where they are used
+LAZY_MODULES = (
+    "pylatex",
+    "commentjson",
+    "lark",
+    "sqlite3",
+    "pprint",
+    "batch",
+    "server",
+    "watch",
+    "stream",
+    "workqueue",
+)
+
+
+def import_times(module: str = "create") -> Tuple[float, Dict[str, float]]:
+    """cumulative import time of `module` and self time of every imported module, in ms"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total = 0.0
+    self_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():  # header line
+            continue
+        self_times[name.strip()] = int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+
+    return total, self_times
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    runs = [import_times() for _ in range(args.repeat)]
+    # best run, slower runs measure other load on the machine, not the imports
+    total, self_times = min(runs, key=lambda run: run[0])
+
+    print(f"import create: {total:.1f}ms (best of {args.repeat}, budget {args.budget_ms:.0f}ms)")
+    for name, ms in sorted(self_times.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {ms:>8.2f}ms  {name}")
+
+    failures = []
+    if total > args.budget_ms:
+        failures.append(f"import time {total:.1f}ms is over the {args.budget_ms:.0f}ms budget")
+
+    eager = sorted(name for name in self_times if name.split(".")[0] in LAZY_MODULES)
+    if eager:
+        failures.append(f"imported eagerly: {', '.join(eager)}")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""JSONC parse benchmark, jsonc.loads against commentjson
+
+Parses synthetic resumes of roughly 1 KB to 10 MB with both parsers, checks
+that they produce the same data and prints the median time of each.
+commentjson is slow on large inputs, it is skipped above --commentjson-max.
+It is not a dependency of the build, install it with
+
+    pip3 install -r script/benchmarks/requirements.txt
+
+    python3 script/benchmarks/parse.py
+    python3 script/benchmarks/parse.py --sizes 1000 1000000 --output parse.json
+
+Run from the repository root.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import jsonc  # noqa: E402
+from benchmarks.run import measure  # noqa: E402
+from benchmarks.synthetic import make_resume, to_jsonc  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def resume_text(target_bytes: int, seed: int) -> str:
+    """JSONC resume close to `target_bytes` long"""
+    base = len(to_jsonc(make_resume(0, seed)))
+    per_entry = len(to_jsonc(make_resume(10, seed))) - base
+    n = max(0, round((target_bytes - base) * 10 / per_entry))
+    return to_jsonc(make_resume(n, seed))
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="bytes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--commentjson-max", type=int, default=1_000_000, help="bytes")
+    parser.add_argument("--output", type=Path, help="write results as json")
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    import commentjson
+
+    results = {}
+    print(f"{'size':>12}{'jsonc':>14}{'commentjson':>14}{'speedup':>10}")
+    for target in args.sizes:
+        text = resume_text(target, args.seed)
+        row = {"bytes": len(text.encode("utf-8"))}
+        row["jsonc"] = measure(lambda: jsonc.loads(text), args.repeat)
+
+        if len(text) <= args.commentjson_max:
+            if jsonc.loads(text) != commentjson.loads(text):
+                raise SystemExit(f"jsonc and commentjson disagree at {row['bytes']} bytes")
+            row["commentjson"] = measure(lambda: commentjson.loads(text), args.repeat)
+
+        results[str(target)] = row
+        reference = row.get("commentjson")
+        print(
+            f"{row['bytes']:>12}{row['jsonc'] * 1000:>12.2f}ms"
+            + (f"{reference * 1000:>12.2f}ms{reference / row['jsonc']:>9.1f}x" if reference else "")
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps({"unit": "seconds", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""stage level benchmark of the resume build on synthetic resumes
+
+Times JSONC parsing, rendering of every section, asset staging and the
+compile step (against a stub latexmk that only touches resume.pdf, so it runs
+offline) for resumes with 10 to 10,000 entries per section.
+
+    python3 script/benchmarks/run.py --output bench.json
+    python3 script/benchmarks/run.py --save-baseline
+    python3 script/benchmarks/run.py --baseline script/benchmarks/baseline.json
+
+Run from the repository root.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import config  # noqa: E402
+import create  # noqa: E402
+import staging  # noqa: E402
+from benchmarks.synthetic import make_resume, to_jsonc  # noqa: E402
+from resume.fragments import get_fragment_cache  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+
+STUB_LATEXMK = """#!/bin/sh
+touch resume.pdf resume.log
+"""
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """median wall time of `repeat` runs of `fn`, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings)
+
+
+def cold(fn: Callable[[], object]) -> Callable[[], object]:
+    """run `fn` with an empty fragment cache"""
+
+    def wrapped():
+        get_fragment_cache().clear()
+        return fn()
+
+    return wrapped
+
+
+def bench_size(n: int, repeat: int, work_dir: Path, seed: int) -> Dict[str, float]:
+    data = make_resume(n, seed)
+    jsonc_path = work_dir.joinpath(f"resume-{n}.jsonc")
+    jsonc_path.write_text(to_jsonc(data))
+
+    results = {"parse": measure(lambda: create.parse_json(jsonc_path), repeat)}
+
+    results["render.meta"] = measure(cold(lambda: create.create_metadata(data)), repeat)
+    for section_type in create.get_order(data):
+        results[f"render.{section_type.name}"] = measure(
+            cold(lambda: create.get_section_text(section_type, data)), repeat
+        )
+
+    meta_text = create.create_metadata(data)
+
+    def stage():
+        with tempfile.TemporaryDirectory(dir=work_dir) as td:
+            assets = staging.required_assets(config.TEMPLATE_DIR, meta_text)
+            staging.stage_assets(assets, Path(td))
+
+    results["staging"] = measure(stage, repeat)
+
+    content_text = "".join(create.iter_content(data))
+    output_filename = f"bench-{n}"
+    results["compile"] = measure(
+        lambda: create.compile_tex_file(content_text, meta_text, output_filename), repeat
+    )
+
+    results["total"] = sum(results.values())
+    return results
+
+
+def compare(results: dict, baseline: dict) -> dict:
+    """ratio current / baseline for every (size, stage) present in both"""
+    comparison = {}
+    for size, stages in results.items():
+        base_stages = baseline.get(size, {})
+        comparison[size] = {
+            stage: round(seconds / base_stages[stage], 3)
+            for stage, seconds in stages.items()
+            if base_stages.get(stage)
+        }
+
+    return comparison
+
+
+def print_table(results: dict, comparison: dict) -> None:
+    stages = sorted({stage for size in results.values() for stage in size})
+    sizes = list(results)
+    print(f"{'stage':<20}" + "".join(f"{size:>18}" for size in sizes))
+    for stage in stages:
+        row = f"{stage:<20}"
+        for size in sizes:
+            seconds = results[size].get(stage)
+            ratio = comparison.get(size, {}).get(stage)
+            cell = f"{seconds * 1000:.2f}ms" if seconds is not None else "-"
+            if ratio is not None:
+                cell += f" ({ratio:.2f}x)"
+            row += f"{cell:>18}"
+        print(row)
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write results as json")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store the results as the new baseline"
+    )
+    return parser.parse_args(args)
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    logging.basicConfig(level=logging.WARNING)
+    config.LOG_LEVEL = logging.WARNING
+    config.USE_BUILD_CACHE = False
+    config.KEEP_GENERATED_TEX = False
+    config.KEEP_LOG_FILES = False
+
+    with tempfile.TemporaryDirectory() as td:
+        work_dir = Path(td)
+        # pdfs, generated tex and manifests of the compile stage go away with the temp dir
+        config.OUT_DIR = work_dir.joinpath("out")
+        stub_dir = work_dir.joinpath("bin")
+        stub_dir.mkdir()
+        stub = stub_dir.joinpath("latexmk")
+        stub.write_text(STUB_LATEXMK)
+        stub.chmod(0o755)
+        os.environ["PATH"] = f"{stub_dir}{os.pathsep}{os.environ['PATH']}"
+
+        results = {}
+        for n in args.sizes:
+            results[str(n)] = bench_size(n, args.repeat, work_dir, args.seed)
+
+    baseline = {}
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())["results"]
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "unit": "seconds",
+        "results": results,
+        "comparison": compare(results, baseline),
+    }
+
+    print_table(results, report["comparison"])
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"saved baseline to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
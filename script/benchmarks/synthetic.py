@@ -0,0 +1,101 @@
+"""deterministic synthetic JSON Resume documents shaped like resume.jsonc"""
+import json
+import random
+
+NETWORKS = ["github", "linkedin", "kaggle", "twitter", "codeforces", "hackerearth", "spoj"]
+WORDS = (
+    "data pipeline model service api latency cluster python docker analysis "
+    "training deployment research dataset backend frontend & 100% #1 team_lead"
+).split()
+
+
+def sentence(rng: random.Random, n_words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize()
+
+
+def date(rng: random.Random) -> str:
+    return f"{rng.randint(2000, 2022)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def make_resume(n: int, seed: int = 0) -> dict:
+    """resume with `n` entries in every section (profiles capped at 20)"""
+    rng = random.Random(seed)
+
+    return {
+        "meta": {
+            "main_color": "MaterialBlue",
+            "sec_color": "MaterialGrey",
+            "order": ["experience", "education", "technical_skill", "project", "achievement"],
+        },
+        "basics": {
+            "name": "Synthetic Person",
+            "label": "Engineer",
+            "email": "person@example.com",
+            "phone": "0000000000",
+            "phoneFormat": "(+00) 000 000 0000",
+            "summary": sentence(rng, 40),
+            "profiles": [
+                {
+                    "network": NETWORKS[idx % len(NETWORKS)],
+                    "username": f"user_{idx}",
+                    "url": f"https://example.com/user_{idx}",
+                }
+                for idx in range(min(n, 20))
+            ],
+        },
+        "work": [
+            {
+                "company": f"Company {idx}",
+                "position": sentence(rng, 3),
+                "location": "City, Country",
+                "website": f"https://company{idx}.example.com",
+                "startDate": date(rng),
+                "endDate": date(rng),
+                "summary": "",
+                "highlights": [sentence(rng) for _ in range(3)],
+            }
+            for idx in range(n)
+        ],
+        "education": [
+            {
+                "institution": f"Institute {idx}",
+                "area": sentence(rng, 3),
+                "studyType": "Bachelor of Technology",
+                "startDate": date(rng),
+                "endDate": date(rng),
+                "location": "City, Country",
+                "url": f"https://institute{idx}.example.com",
+                "highlights": [sentence(rng) for _ in range(2)],
+            }
+            for idx in range(n)
+        ],
+        "awards": [{"title": sentence(rng, 6), "date": date(rng)} for _ in range(n)],
+        "skills": [
+            {
+                "name": f"Skill group {idx}",
+                "level": "",
+                "keywords": [rng.choice(WORDS) for _ in range(5)],
+            }
+            for idx in range(n)
+        ],
+        "projects": [
+            {
+                "name": f"Project {idx}",
+                "description": sentence(rng),
+                "highlights": [sentence(rng) for _ in range(2)],
+                "keywords": [rng.choice(WORDS) for _ in range(4)],
+                "startDate": date(rng),
+                "endDate": date(rng),
+                "url": f"https://example.com/project{idx}",
+                "type": "Data Analysis",
+            }
+            for idx in range(n)
+        ],
+    }
+
+
+def to_jsonc(data: dict) -> str:
+    """serialize with comments so the JSONC parser has something to strip"""
+    lines = json.dumps(data, indent=2).splitlines()
+    lines = [f"{line} // custom" if '"phoneFormat"' in line else line for line in lines]
+    return "// synthetic resume\n" + "\n".join(lines) + "\n"
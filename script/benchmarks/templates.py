@@ -0,0 +1,72 @@
+"""micro-benchmark of the compiled template registry against per call
+Template construction + fill_template, on a CV with thousands of entries
+
+    python3 script/benchmarks/templates.py [n_entries]
+"""
+import sys
+import time
+from pathlib import Path
+from string import Template
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from resume.sections import TEMPLATES, fill_template  # noqa: E402
+
+
+def make_entries(n: int):
+    for idx in range(n):
+        data = {
+            "position": f"Position {idx}",
+            "location": "Mumbai, India",
+            "work_place": f"Company {idx}",
+            "start": "May 2021",
+            "end": "Jul 2021",
+        }
+        highlights = {
+            "highlights": "\n\t".join(f"\\item highlight {idx}.{item}" for item in range(3))
+        }
+        yield data, highlights
+
+
+def legacy(entries) -> str:
+    raw = TEMPLATES["experience"].raw.template
+    raw_highlights = TEMPLATES["experience_highlights"].raw.template
+    return "".join(
+        fill_template(Template(raw), data) + fill_template(Template(raw_highlights), highlights)
+        for data, highlights in entries
+    )
+
+
+def compiled(entries) -> str:
+    template = TEMPLATES["experience"]
+    highlights_template = TEMPLATES["experience_highlights"]
+    return "".join(
+        template.fill(data) + highlights_template.fill(highlights) for data, highlights in entries
+    )
+
+
+def best_of(fn, entries, repeat: int = 5):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(entries)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    entries = list(make_entries(n))
+
+    legacy_time, legacy_text = best_of(legacy, entries)
+    compiled_time, compiled_text = best_of(compiled, entries)
+    assert legacy_text == compiled_text, "compiled templates changed the output"
+
+    print(f"entries:  {n}")
+    print(f"legacy:   {legacy_time / n * 1e6:8.2f} us/entry")
+    print(f"compiled: {compiled_time / n * 1e6:8.2f} us/entry")
+    print(f"speedup:  {legacy_time / compiled_time:8.2f}x (output byte-identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""build directories for compile_tex_file
+
+By default every compile runs in a fresh temporary directory. With
+`config.USE_PERSISTENT_BUILD` each (output name, template) pair keeps its
+directory under `config.PERSISTENT_BUILD_DIR`, so latexmk finds the .aux,
+.fdb_latexmk etc. of the last run and can skip passes. A directory is locked
+(flock on a sibling .lock file) while a build uses it, `cleanup` removes
+directories unused for longer than `config.PERSISTENT_BUILD_MAX_AGE` and the
+least recently used ones while the total exceeds
+`config.PERSISTENT_BUILD_MAX_BYTES`.
+"""
+import contextlib
+import fcntl
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import config
+
+UNSAFE_CHARS_RE = re.compile(r"[^\w.-]+")
+
+
+def lock_path(path: Path) -> Path:
+    # lock files are never removed, a waiter could hold the lock of a deleted file
+    return path.parent.joinpath(path.name + ".lock")
+
+
+def build_key(output_filename: str, template_dir: Path) -> str:
+    name = UNSAFE_CHARS_RE.sub("_", f"{output_filename}-{Path(template_dir).name}")
+    return name.strip("._") or "resume"
+
+
+@contextlib.contextmanager
+def locked(lock_path: Path, blocking: bool = True) -> Iterator[bool]:
+    """hold an exclusive flock on `lock_path`, yields False if `blocking` is
+    False and another process or thread holds it"""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def build_directory(output_filename: str, template_dir: Path) -> Iterator[Path]:
+    """directory to compile `output_filename` against `template_dir` in"""
+    if not config.USE_PERSISTENT_BUILD:
+        with tempfile.TemporaryDirectory() as td:
+            yield Path(td)
+        return
+
+    path = config.PERSISTENT_BUILD_DIR.joinpath(build_key(output_filename, template_dir))
+    with locked(lock_path(path)):
+        path.mkdir(parents=True, exist_ok=True)
+        os.utime(path)  # last used, for cleanup
+        logging.info(f"building in persistent directory {path}")
+        yield path
+
+
+def replace_if_changed(new_path: Path, path: Path) -> bool:
+    """move `new_path` over `path` unless both have the same bytes, an
+    unchanged file keeps its mtime. returns True if `path` was replaced"""
+    try:
+        same_size = new_path.stat().st_size == path.stat().st_size
+        if same_size and new_path.read_bytes() == path.read_bytes():
+            new_path.unlink()
+            return False
+    except FileNotFoundError:
+        pass
+
+    os.replace(new_path, path)
+    return True
+
+
+def directory_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+
+    return total
+
+
+def cleanup(max_age: float = None, max_bytes: int = None) -> List[str]:
+    """remove stale persistent build directories, skipping those in use,
+    returns the removed keys"""
+    max_age = config.PERSISTENT_BUILD_MAX_AGE if max_age is None else max_age
+    max_bytes = config.PERSISTENT_BUILD_MAX_BYTES if max_bytes is None else max_bytes
+    if not config.PERSISTENT_BUILD_DIR.is_dir():
+        return []
+
+    entries: List[Tuple[float, int, Path]] = []
+    for path in config.PERSISTENT_BUILD_DIR.iterdir():
+        if path.is_dir():
+            entries.append((path.stat().st_mtime, directory_size(path), path))
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for mtime, size, path in sorted(entries):  # least recently used first
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+
+        with locked(lock_path(path), blocking=False) as acquired:
+            if not acquired:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+        total -= size
+        removed.append(path.name)
+        logging.info(f"removed build directory {path.name}")
+
+    return removed
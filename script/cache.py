@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+import staging
+
+# bump to invalidate every entry, e.g. when the latexmk command changes
+CACHE_VERSION = b"2"
+
+_file_digests: Dict[Tuple[str, int, int], bytes] = {}
+
+
+def file_digest(path: Path) -> bytes:
+    """sha256 of a file, memoized on (path, mtime, size) for long running processes"""
+    stat = path.stat()
+    memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+    digest = _file_digests.get(memo_key)
+    if digest is None:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).digest()
+        _file_digests[memo_key] = digest
+
+    return digest
+
+
+class BuildCache:
+    """content addressed PDF cache, keyed by the hash of everything latexmk reads.
+
+    Entries are `<key>.pdf` (+ `<key>.log`) files, the PDF mtime is used as the
+    last access time for LRU eviction once the cache grows over `max_bytes`.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(
+        content_digest: bytes,
+        meta_text: str,
+        template_dir: Path,
+        assets: List[str],
+        assets_dir: Path,
+    ) -> str:
+        """hash of the generated tex (content.tex by its sha256 digest, as it is
+        streamed to disk), the template and the staged `assets` (paths relative
+        to `assets_dir`)"""
+        sha = hashlib.sha256(CACHE_VERSION)
+
+        def update(name: str, digest: bytes):
+            sha.update(name.encode("utf-8") + b"\0" + digest)
+
+        update("content.tex", content_digest)
+        update("meta.tex", hashlib.sha256(meta_text.encode("utf-8")).digest())
+        update("macros.tex", file_digest(template_dir.joinpath("macros.tex")))
+        update("resume.tex", file_digest(template_dir.joinpath("resume.tex")))
+
+        for item in sorted(assets):
+            path = assets_dir.joinpath(item)
+            update(item, file_digest(path) if path.is_file() else b"missing")
+
+        return sha.hexdigest()
+
+    def entry_paths(self, key: str) -> Tuple[Path, Path]:
+        return self.cache_dir.joinpath(f"{key}.pdf"), self.cache_dir.joinpath(f"{key}.log")
+
+    def contains(self, key: str) -> bool:
+        return self.entry_paths(key)[0].is_file()
+
+    def fetch(self, key: str, pdf_path: Path, log_path: Optional[Path] = None) -> bool:
+        """publish a cached build at `pdf_path` (and `log_path`), hardlinked as
+        entries are only ever replaced, returns False on miss"""
+        cached_pdf, cached_log = self.entry_paths(key)
+        try:
+            os.utime(cached_pdf)  # mark as recently used
+            staging.publish(cached_pdf, pdf_path)
+
+        except FileNotFoundError:
+            self.misses += 1
+            return False
+
+        if log_path is not None and cached_log.exists():
+            staging.publish(cached_log, log_path)
+
+        self.hits += 1
+        return True
+
+    def store(self, key: str, pdf_path: Path, log_path: Optional[Path] = None) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cached_pdf, cached_log = self.entry_paths(key)
+
+        if log_path is not None and log_path.exists():
+            self._atomic_copy(log_path, cached_log)
+
+        self._atomic_copy(pdf_path, cached_pdf)  # pdf last, its presence marks a full entry
+        self.evict()
+
+    def _atomic_copy(self, src: Path, dst: Path) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(src, tmp_name)
+            os.replace(tmp_name, dst)
+
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def evict(self) -> None:
+        """remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for cached_pdf in self.cache_dir.glob("*.pdf"):
+            cached_log = cached_pdf.with_suffix(".log")
+            try:
+                size = cached_pdf.stat().st_size
+                size += cached_log.stat().st_size if cached_log.exists() else 0
+                entries.append((cached_pdf.stat().st_mtime, size, cached_pdf, cached_log))
+
+            except FileNotFoundError:  # evicted concurrently
+                continue
+
+            total += size
+
+        entries.sort()
+        for _, size, cached_pdf, cached_log in entries:
+            if total <= self.max_bytes:
+                break
+
+            for path in (cached_pdf, cached_log):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+            total -= size
+            logging.info(f"evicted {cached_pdf.stem} from build cache")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_build_cache: Optional[BuildCache] = None
+
+
+def get_build_cache() -> BuildCache:
+    global _build_cache
+    if _build_cache is None:
+        _build_cache = BuildCache(config.BUILD_CACHE_DIR, config.BUILD_CACHE_MAX_BYTES)
+
+    return _build_cache
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 import logging
 
@@ -7,11 +8,61 @@ LOG_LEVEL = logging.DEBUG
 # Flags
 KEEP_GENERATED_TEX = True
 KEEP_LOG_FILES = True
+USE_BUILD_CACHE = True
+USE_PREAMBLE_FORMAT = False
+USE_FRAGMENT_STORE = False
+USE_PERSISTENT_BUILD = False
 
 # Timeouts
 LATEXMK_TIMEOUT = 10
 TIMEOUT = 5
 
 # Paths
+ASSETS_DIR = Path("./assets")
 SOCIAL_PROFILES_PATH = Path("./assets/data/social_profiles.json")
-TEMPLATE_DIR = Path("./script/resume/template_original")
\ No newline at end of file
+TEMPLATE_DIR = Path("./script/resume/template_original")
+OUT_DIR = Path("./out")
+
+# Fragment cache
+FRAGMENT_CACHE_SIZE = 4096
+FRAGMENT_STORE_PATH = Path("./.cache/fragments.sqlite")
+
+# Tracing, chrome trace-event json written here when set
+TRACE_PATH = os.environ.get("RESUME_TRACE")
+
+# Watch
+WATCH_BUILD_DIR = Path("./.cache/watch")
+WATCH_INTERVAL = 0.2
+
+# Batch
+BATCH_JOBS = os.cpu_count() or 1
+BATCH_LOG_DIR = OUT_DIR.joinpath("logs")
+
+# Stream, JSONL input read in chunks, documents queued per worker
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_QUEUE_SIZE = 2
+STREAM_MAX_DOCUMENT_SIZE = 16 * 1024 * 1024
+
+# Queue, journal and claims of resumable batches, may be on a shared filesystem
+QUEUE_DIR = Path("./.cache/queue")
+QUEUE_LEASE = 120  # seconds without heartbeat before a claim is taken over
+QUEUE_POLL_INTERVAL = 1.0
+
+# Service
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_WORKERS = BATCH_JOBS
+SERVICE_RENDER_WORKERS = 2  # parse, validate and render, off the event loop
+SERVICE_QUEUE_SIZE = 16
+SERVICE_MAX_BODY_BYTES = 1024 * 1024
+SERVICE_OUT_DIR = OUT_DIR.joinpath("service")
+
+# Persistent build directories
+PERSISTENT_BUILD_DIR = Path("./.cache/build")
+PERSISTENT_BUILD_MAX_AGE = 7 * 24 * 60 * 60  # seconds
+PERSISTENT_BUILD_MAX_BYTES = 512 * 1024 * 1024
+
+# Build cache
+BUILD_CACHE_DIR = Path("./.cache/pdf")
+BUILD_CACHE_MAX_BYTES = 256 * 1024 * 1024
+PREAMBLE_FORMAT_DIR = Path("./.cache/fmt")
@@ -1,213 +1,484 @@
+import argparse
 import enum
+import hashlib
+import json
 import logging
-import os
-import subprocess
 import sys
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List, Tuple, Union
-from pprint import pprint
-import commentjson
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
 
 import config
+import jsonc
 import resume.sections as sections
+import tracing
 
+# build modules and the validation model are imported where they are used,
+# `create` is imported by the batch, stream and service parents that never compile
+if TYPE_CHECKING:
+    import latexmk
 
-def create_resume_(data: dict, output_filename: str):
-    class SECTIONS(enum.Enum):
-        none = enum.auto()
-        achv = enum.auto()
-        skills = enum.auto()
-        experience = enum.auto()
-        education = enum.auto()
-        project = enum.auto()
-
-    section_mapping = {
-        "experience": SECTIONS.experience,
-        "education": SECTIONS.education,
-        "technical_skill": SECTIONS.skills,
-        "project": SECTIONS.project,
-        "achievement": SECTIONS.achv,
-    }
 
-    def get_order(data: dict):
-        default_order = ["experience", "education", "technical_skill", "project", "achievement"]
+class SECTIONS(enum.Enum):
+    none = enum.auto()
+    achv = enum.auto()
+    skills = enum.auto()
+    experience = enum.auto()
+    education = enum.auto()
+    project = enum.auto()
 
-        if data.get("meta"):
-            if data["meta"].get("order"):
-                order = data["meta"].get("order")
-                return [section_mapping.get(item, SECTIONS.none) for item in order]
 
-        return [section_mapping.get(item, SECTIONS.none) for item in default_order]
+class BuildResult(NamedTuple):
+    ok: bool
+    errors: List["latexmk.TexError"] = []
 
-    def create_metadata() -> str:
-        nonlocal data
-        meta_text = ""
-        metadata = sections.MetaData(data["basics"])
-        metadata.set_colors(data.get("meta"))
-        meta_text += metadata.to_latex()
 
+section_mapping = {
+    "experience": SECTIONS.experience,
+    "education": SECTIONS.education,
+    "technical_skill": SECTIONS.skills,
+    "project": SECTIONS.project,
+    "achievement": SECTIONS.achv,
+}
+
+# key of the resume data each section is rendered from
+section_data_keys = {
+    SECTIONS.achv: "awards",
+    SECTIONS.skills: "skills",
+    SECTIONS.experience: "work",
+    SECTIONS.education: "education",
+    SECTIONS.project: "projects",
+}
+
+
+def get_order(data: dict) -> List[SECTIONS]:
+    default_order = ["experience", "education", "technical_skill", "project", "achievement"]
+
+    if data.get("meta"):
+        if data["meta"].get("order"):
+            order = data["meta"].get("order")
+            return [section_mapping.get(item, SECTIONS.none) for item in order]
+
+    return [section_mapping.get(item, SECTIONS.none) for item in default_order]
+
+
+def create_metadata(data: dict, context: sections.RenderContext = None) -> str:
+    with tracing.span("metadata"):
+        # profile links first, the color commands they use go into the metadata
+        context = context or sections.RenderContext()
         profile_text = "\n"
-        profiles = sections.ProfileLinks(data["basics"]["profiles"])
+        profiles = sections.ProfileLinks(data["basics"]["profiles"], context)
         profile_text += profiles.to_latex()
 
-        return meta_text + profile_text
+        metadata = sections.MetaData(data["basics"])
+        metadata.set_colors(data.get("meta"))
+        meta_text = metadata.to_latex(context)
+
+    return meta_text + profile_text
+
 
-    def get_section_text(section_type: SECTIONS) -> str:
-        """get text for all sections except meta and profile"""
+def iter_section_text(section_type: SECTIONS, data: dict) -> Iterator[str]:
+    """yield text for all sections except meta and profile, fragment by fragment"""
 
-        def get_section_name():
-            nonlocal section_type
-            mapping = {
-                SECTIONS.achv: "Achievements",
-                SECTIONS.skills: "Technical Skills",
-                SECTIONS.experience: "Experience",
-                SECTIONS.education: "Education",
-                SECTIONS.project: "Projects",
-            }
-            return mapping[section_type]
+    def get_section_name():
+        mapping = {
+            SECTIONS.achv: "Achievements",
+            SECTIONS.skills: "Technical Skills",
+            SECTIONS.experience: "Experience",
+            SECTIONS.education: "Education",
+            SECTIONS.project: "Projects",
+        }
+        return mapping[section_type]
 
-        nonlocal data
-        section_begin = "\\section{" + get_section_name() + "}\n"
-        section_text = ""
+    with tracing.span(f"render.{section_type.name}"):
+        yield "\\section{" + get_section_name() + "}\n"
 
         if section_type is SECTIONS.achv:
-            section_text += sections.Achievements(data["awards"]).to_latex()
+            yield from sections.Achievements(data["awards"]).iter_latex()
 
         if section_type is SECTIONS.skills:
-            section_text += sections.TechnicalSkills(data["skills"]).to_latex()
+            yield from sections.TechnicalSkills(data["skills"]).iter_latex()
 
         if section_type is SECTIONS.experience:
-            section_text += sections.Experience(data["work"]).to_latex()
+            yield from sections.Experience(data["work"]).iter_latex()
 
         if section_type is SECTIONS.education:
-            section_text += sections.Education(data["education"]).to_latex()
+            yield from sections.Education(data["education"]).iter_latex()
 
         if section_type is SECTIONS.project:
-            section_text += sections.Projects(data["projects"]).to_latex()
+            yield from sections.Projects(data["projects"]).iter_latex()
 
-        return section_begin + section_text + "\n"
+        yield "\n"
 
-    order = get_order(data)
-    meta_text = create_metadata()
 
-    content_text = ""
-    for section_type in order:
-        content_text += get_section_text(section_type)
+def get_section_text(section_type: SECTIONS, data: dict) -> str:
+    return "".join(iter_section_text(section_type, data))
 
-    logging.info(f"generated text, moving files to compilation")
-    compile_tex_file(content_text, meta_text, output_filename)
 
+def iter_content(data: dict) -> Iterator[str]:
+    """yield content.tex fragments of all sections in order"""
+    for section_type in get_order(data):
+        yield from iter_section_text(section_type, data)
 
-def compile_tex_file(content_text: str, meta_text: str, output_filename: str) -> None:
-    """compile tex file with main.tex string passed into input with temporary directory"""
 
-    template_dir = config.TEMPLATE_DIR
-    logging.info(f"using template {template_dir.name}")
+def render_resume(data: dict) -> Tuple[str, str]:
+    """render resume data into (meta_text, content_text)"""
+    meta_text = create_metadata(data)
+    return meta_text, "".join(iter_content(data))
+
+
+def write_fragments(path: Path, fragments: Iterable[str], buffer_size: int = 1 << 16) -> bytes:
+    """write text fragments to `path` through a buffered writer without joining
+    them in memory, returns the sha256 digest of the written bytes"""
+    sha = hashlib.sha256()
+    with open(path, "wb", buffering=buffer_size) as f:
+        for fragment in fragments:
+            data = fragment.encode("utf-8")
+            sha.update(data)
+            f.write(data)
+
+    return sha.digest()
 
-    with tempfile.TemporaryDirectory() as td:
-        temp_path = Path(td)
-        main_cwd = Path(os.getcwd())
-        outdir_nm = output_filename
-
-        with open(temp_path.joinpath("content.tex"), "w") as content_file:
-            content_file.write(content_text)
-
-        with open(temp_path.joinpath("meta.tex"), "w") as meta_file:
-            meta_file.write(meta_text)
-
-        def run_process(cmd: str, timeout=config.TIMEOUT):
-            process = subprocess.run(
-                cmd,
-                shell=True,
-                executable="/bin/bash",
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=timeout,
+
+def create_resume_(data: dict, output_filename: str) -> BuildResult:
+    meta_text = create_metadata(data)
+
+    logging.info(f"generated metadata, streaming content into compilation")
+    return compile_tex_file(iter_content(data), meta_text, output_filename)
+
+
+def template_name(template_dir: Path) -> str:
+    """template_original -> original"""
+    return Path(template_dir).name[len("template_") :]
+
+
+def template_dirs() -> Dict[str, Path]:
+    """available templates by name"""
+    return {
+        template_name(path): path
+        for path in sorted(config.TEMPLATE_DIR.parent.glob("template_*"))
+        if path.joinpath("resume.tex").is_file()
+    }
+
+
+def create_resume_templates(
+    data: dict, output_filename: str, templates: Dict[str, Path], jobs: int = config.BATCH_JOBS
+) -> Dict[str, BuildResult]:
+    """render the resume once and compile it against every template in
+    `templates` on a thread pool, the pdfs are saved as <output_filename>-<name>.
+    returns the build result of each template"""
+    meta_text, content_text = render_resume(data)
+    logging.info(f"rendered once, compiling against {', '.join(templates)}")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(templates)))) as executor:
+        futures = {
+            name: executor.submit(
+                compile_tex_file, content_text, meta_text, f"{output_filename}-{name}", path
             )
-            return process
+            for name, path in templates.items()
+        }
+
+    return {name: future.result() for name, future in futures.items()}
+
+
+def job_dir(output_filename: str) -> Path:
+    """output namespace of a build, out/<output_filename>/, holding its
+    generated tex, latex_stdout.txt and manifest.json"""
+    return config.OUT_DIR.joinpath(output_filename)
+
+
+def reserved_output_filenames() -> List[str]:
+    """names of the directories in config.OUT_DIR that are not a job's namespace"""
+    return [
+        path.relative_to(config.OUT_DIR).parts[0]
+        for path in (config.BATCH_LOG_DIR, config.SERVICE_OUT_DIR)
+        if config.OUT_DIR in path.parents
+    ]
+
+
+def check_output_filename(output_filename: str) -> None:
+    """raises ValueError if the job namespace of `output_filename` is a reserved directory"""
+    if output_filename in reserved_output_filenames():
+        raise ValueError(
+            f"output name {output_filename!r} is reserved, out/{output_filename}/ "
+            f"is not a job directory, pick another output name"
+        )
+
+
+def save_generated_tex(
+    content_path: Path, meta_text: str, template_dir: Path, output_filename: str
+) -> List[Path]:
+    """publish the generated tex files along with the template into the job's
+    output namespace, returns the published paths"""
+    import staging
+
+    out_path = job_dir(output_filename)
+    published = []
+    for name in staging.TEMPLATE_FILES:
+        # template sources can be edited in place, copied
+        staging.publish(template_dir.joinpath(name), out_path.joinpath(name), link=False)
+        published.append(out_path.joinpath(name))
+
+    staging.publish(content_path, out_path.joinpath("content.tex"))  # only ever replaced
+    staging.publish_text(meta_text, out_path.joinpath("meta.tex"))
+    return [*published, out_path.joinpath("content.tex"), out_path.joinpath("meta.tex")]
+
+
+def compile_tex_file(
+    content: Union[str, Iterable[str]],
+    meta_text: str,
+    output_filename: str,
+    template_dir: Path = None,
+) -> BuildResult:
+    """compile tex file with main.tex string passed into input in a build directory,
+    `content` is the content.tex text or an iterable of its fragments, streamed to disk.
+    Every output is published atomically: out/<output_filename>.pdf and .log, the
+    generated tex in out/<output_filename>/ and a manifest of them with their hashes.
+    returns whether the pdf was built and saved, with the LaTeX errors if not"""
+    import builddir
+    import cache
+    import latexmk
+    import preamble
+    import staging
+
+    template_dir = Path(template_dir or config.TEMPLATE_DIR)
+    logging.info(f"using template {template_dir.name}")
 
-        latemk_stdout = None
-        error_raised = False
-        try:
-            move_process = run_process(
-                f"""
-                cp "{template_dir}/macros.tex" "{temp_path}/macros.tex"
-                cp "{template_dir}/resume.tex" "{temp_path}/resume.tex"
-                cp -R "./assets" "{temp_path}"
-                mkdir -p out
-                """
+    assets = staging.required_assets(template_dir, meta_text)
+    pdf_path = config.OUT_DIR.joinpath(f"{output_filename}.pdf")
+    log_path = config.OUT_DIR.joinpath(f"{output_filename}.log")
+    manifest_info = {"name": output_filename, "template": template_name(template_dir)}
+    # build products of a persistent directory are rewritten in place by the next run
+    link = not config.USE_PERSISTENT_BUILD
+
+    with builddir.build_directory(output_filename, template_dir) as build_path:
+        with tracing.span("write_tex"):
+            # written aside and swapped in, unchanged files keep their mtime in
+            # a persistent build directory
+            fragments = [content] if isinstance(content, str) else content
+            content_path = build_path.joinpath("content.tex")
+            content_digest = write_fragments(content_path.with_suffix(".tex.new"), fragments)
+            builddir.replace_if_changed(content_path.with_suffix(".tex.new"), content_path)
+
+            meta_path = build_path.joinpath("meta.tex")
+            meta_path.with_suffix(".tex.new").write_text(meta_text)
+            builddir.replace_if_changed(meta_path.with_suffix(".tex.new"), meta_path)
+
+        build_cache = cache.get_build_cache() if config.USE_BUILD_CACHE else None
+        if build_cache is not None:
+            cache_key = build_cache.key(
+                content_digest, meta_text, template_dir, assets, config.ASSETS_DIR
             )
-            logging.info("moved files into temp directory")
 
-            if config.KEEP_GENERATED_TEX:
-                out_resume_path = f"{main_cwd}/out/resume"
-                move_created_tex_files = run_process(
-                    f"""
-                    mkdir -p out/resume
-                    cp "{template_dir}/macros.tex" "{out_resume_path}/macros.tex"
-                    cp "{template_dir}/resume.tex" "{out_resume_path}/resume.tex"
-                    cp "{temp_path}/content.tex" "{out_resume_path}/content.tex"
-                    cp "{temp_path}/meta.tex" "{out_resume_path}/meta.tex"
-                    """
+            with tracing.span("cache_lookup"):
+                cache_hit = build_cache.fetch(
+                    cache_key, pdf_path, log_path if config.KEEP_LOG_FILES else None
                 )
 
-        except subprocess.TimeoutExpired as e:
-            logging.error(f"Timeout during initial move\n" + str(e))
+            if cache_hit:
+                artifacts = [pdf_path]
+                if config.KEEP_LOG_FILES and log_path.exists():
+                    artifacts.append(log_path)
+                if config.KEEP_GENERATED_TEX:
+                    artifacts += save_generated_tex(
+                        content_path, meta_text, template_dir, output_filename
+                    )
+                staging.write_manifest(
+                    job_dir(output_filename), artifacts, ok=True, cached=True, **manifest_info
+                )
+                logging.info(f"build cache hit ({cache_key[:12]}), saved {output_filename}.pdf")
+                return BuildResult(True)
 
-        except subprocess.CalledProcessError as e:
-            logging.error(f"ProcessError for initial move:\n" + str(e))
+            logging.info(f"build cache miss ({cache_key[:12]})")
 
-        else:
-            # no exception generated in move block, can move to compilation phase
-            try:
-                latexmk_process = run_process(
-                    f"""
-                    cd "{temp_path}"
-                    latexmk -xelatex resume.tex
-                    """,
-                    timeout=config.LATEXMK_TIMEOUT,
-                )
+        preamble_format = preamble.get_format(template_dir) if config.USE_PREAMBLE_FORMAT else None
 
-            except subprocess.TimeoutExpired as e:
-                logging.error("Timeout during latexmk run:\n" + str(e))
-                error_raised = True
-                latemk_stdout = str(e.output.decode("utf-8"))
-
-            except subprocess.CalledProcessError as e:
-                logging.error("ProcessError for latexmk:\n" + str(e))
-                error_raised = True
-
-            else:  # get pdf file, as no exceptions raised
-                get_pdf_file_proc = run_process(
-                    f"""
-                    cd "{temp_path}"
-                    cp -R "resume.pdf" "{main_cwd}/out/{output_filename}.pdf"
-                    """
+        artifacts = []
+        try:
+            with tracing.span("asset_copy", assets=len(assets)):
+                staging.stage_template(template_dir, build_path)
+                staging.stage_assets(assets, build_path)
+                if preamble_format is not None:
+                    preamble.stage_format(preamble_format, build_path)
+            logging.info("moved files into build directory")
+
+            if config.KEEP_GENERATED_TEX:
+                artifacts += save_generated_tex(
+                    content_path, meta_text, template_dir, output_filename
                 )
-                logging.info(f"build and saved {output_filename}.pdf")
 
-            finally:  # get latexmk log, in any case, evenif exceptions raised or not
-                if config.KEEP_LOG_FILES:
-                    try:
-                        get_latex_log_process = run_process(
-                            f"""
-                            cd "{temp_path}"
-                            cp -R "resume.log" "{main_cwd}/out/{output_filename}.log"
-                            """
-                        )
+        except OSError as e:
+            logging.error(f"Error while staging files:\n" + str(e))
+            return BuildResult(False)
+
+        format_args = preamble.latexmk_args() if preamble_format is not None else []
+        try:
+            with tracing.span("latexmk"):
+                result = latexmk.run_latexmk(build_path, format_args)
+
+        except OSError as e:
+            logging.error("could not run latexmk:\n" + str(e))
+            return BuildResult(False)
+
+        if result.ok:
+            with tracing.span("pdf_copy"):
+                staging.publish(build_path.joinpath("resume.pdf"), pdf_path, link)
+            artifacts.insert(0, pdf_path)
+            logging.info(f"build and saved {output_filename}.pdf")
+
+            if build_cache is not None:
+                build_cache.store(
+                    cache_key, build_path.joinpath("resume.pdf"), build_path.joinpath("resume.log")
+                )
 
-                        log_text = open(f"{main_cwd}/out/{output_filename}.log", "r").read()
-                        if error_raised:
-                            pprint("LaTeX Log\n" + log_text)
+        else:
+            for error in result.errors:
+                logging.error(f"LaTeX error in {output_filename}: {error}")
+
+        if config.KEEP_LOG_FILES:  # get latexmk log, in any case
+            with tracing.span("log_extraction"):
+                try:
+                    staging.publish(build_path.joinpath("resume.log"), log_path, link)
+                    artifacts.append(log_path)
+                except OSError as e:
+                    logging.error(f"error during log_extraction: {e}")
+
+                if result.timed_out:
+                    stdout_path = job_dir(output_filename).joinpath("latex_stdout.txt")
+                    staging.publish_text(result.output, stdout_path)
+                    artifacts.append(stdout_path)
+
+        staging.write_manifest(
+            job_dir(output_filename), artifacts, ok=result.ok, cached=False, **manifest_info
+        )
+        return BuildResult(result.ok, result.errors)
+
+
+def parse_json(path: Path = "./resume.jsonc") -> dict:
+    with open(path, "r") as f:
+        data = jsonc.load(f)
+    return data
+
+
+def load_resume(path: Path) -> dict:
+    """parse and validate a resume file, returns the normalised data, raises
+    json.JSONDecodeError or model.ValidationError listing every problem"""
+    from resume import model
+
+    with tracing.span("parse"):
+        data = parse_json(path)
+    with tracing.span("validate"):
+        return model.validate(data).to_dict()
+
+
+def get_output_filename(path: Union[str, Path]) -> str:
+    """output name used for a resume file, `./resume.jsonc` -> `resume`"""
+    return Path(path).stem
+
+
+def parse_args(args: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="create LaTeX PDFs from JSON-Resume files")
+    parser.add_argument("path", nargs="?", help="path of the .jsonc resume file")
+    parser.add_argument("output_filename", nargs="?", help="name of the pdf in ./out")
+    parser.add_argument(
+        "--batch",
+        metavar="DIR_OR_GLOB",
+        help="build every resume in a directory (or matching a glob) on a process pool",
+    )
+    parser.add_argument(
+        "--stream",
+        metavar="JSONL",
+        help="build every document of a JSONL (or concatenated JSON) file, - for stdin",
+    )
+    parser.add_argument(
+        "--queue",
+        metavar="DIR",
+        help="with --batch, journal finished jobs in DIR, skip them on restart and "
+        "share the batch with other nodes using the same DIR",
+    )
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=config.QUEUE_LEASE,
+        help="seconds before a --queue job claimed by a silent node is taken over",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild whenever the resume or the template changes",
+    )
+    parser.add_argument(
+        "--templates",
+        nargs="+",
+        metavar="NAME",
+        help="render once and build a pdf per template (original, colorstrip, old or all)",
+    )
+    parser.add_argument(
+        "--variants",
+        metavar="SPEC",
+        help="build the tailored variants described in a spec file from the resume",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="run the http render service (POST /render?template=NAME)",
+    )
+    parser.add_argument("--host", default=config.SERVICE_HOST, help="address for --serve")
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT, help="port for --serve")
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=config.SERVICE_QUEUE_SIZE,
+        help="compiles allowed to wait for a worker before --serve answers 503",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=config.BATCH_JOBS,
+        help="number of worker processes for --batch, compile threads for --serve",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="always run latexmk, ignoring the pdf build cache",
+    )
+    parser.add_argument(
+        "--fragment-store",
+        action="store_true",
+        help="persist rendered entry fragments between runs",
+    )
+    parser.add_argument(
+        "--persistent-build",
+        action="store_true",
+        help="keep a build directory per resume and template so latexmk can skip passes",
+    )
+    parser.add_argument(
+        "--preamble-format",
+        action="store_true",
+        help="compile against a cached format of the template's static preamble",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        default=config.TRACE_PATH,
+        help="record stage timings and write them as a chrome trace to PATH",
+    )
 
-                    except subprocess.CalledProcessError as e:
-                        logging.error(f"error during log_extraction process")
+    parsed = parser.parse_args(args)
+    if not parsed.batch and not parsed.serve and not parsed.stream and not parsed.path:
+        parser.error("a resume path, --batch, --stream or --serve is required")
+    if parsed.queue and not parsed.batch:
+        parser.error("--queue needs --batch")
+    for option in ("templates", "variants"):
+        if getattr(parsed, option) and (
+            parsed.batch or parsed.stream or parsed.serve or parsed.watch
+        ):
+            parser.error(f"--{option} builds a single resume, not with --batch, --serve or --watch")
+    if parsed.templates and parsed.variants:
+        parser.error("variants choose their template in the spec, --templates is not supported")
 
-                    if latemk_stdout:
-                        with open(f"{main_cwd}/out/latex_stdout.txt", "w") as stdout_file:
-                            stdout_file.write(latemk_stdout)
+    return parsed
 
 
 def main():
@@ -217,21 +488,131 @@ def main():
         datefmt="%d-%b-%y %H:%M:%S",
     )
 
-    def parse_json(path: Path = "./resume.jsonc") -> dict:
-        with open(path, "r") as f:
-            data = commentjson.load(f)
-        return data
+    args = parse_args(sys.argv[1:])
+    if args.no_cache:
+        config.USE_BUILD_CACHE = False
+    if args.preamble_format:
+        config.USE_PREAMBLE_FORMAT = True
+    if args.fragment_store:
+        config.USE_FRAGMENT_STORE = True
+    if args.persistent_build:
+        config.USE_PERSISTENT_BUILD = True
+    config.TRACE_PATH = args.trace
+
+    try:
+        run(args)
+    finally:
+        if config.USE_PERSISTENT_BUILD:
+            import builddir
+
+            builddir.cleanup()
+        if tracing.enabled():
+            tracing.export_chrome(config.TRACE_PATH)
+            logging.info(f"trace written to {config.TRACE_PATH}\n" + tracing.summary())
+
+
+def run(args: argparse.Namespace):
+    # config of batch and stream worker processes
+    config_overrides = {
+        "USE_BUILD_CACHE": config.USE_BUILD_CACHE,
+        "USE_PREAMBLE_FORMAT": config.USE_PREAMBLE_FORMAT,
+        "USE_FRAGMENT_STORE": config.USE_FRAGMENT_STORE,
+        "USE_PERSISTENT_BUILD": config.USE_PERSISTENT_BUILD,
+        "TRACE_PATH": config.TRACE_PATH,
+    }
+    if args.stream:
+        import stream
+
+        # `--stream FILE [PREFIX]`, the one positional is the output prefix
+        default_prefix = "resume" if args.stream == "-" else get_output_filename(args.stream)
+        prefix = args.path or default_prefix
+        with stream.open_stream(args.stream) as f:
+            summary = stream.build_stream(f, prefix, args.jobs, config_overrides)
+        ok = summary.failed == summary.invalid == 0 and summary.read_error is None
+        sys.exit(0 if ok else 1)
+
+    if args.batch:
+        import batch
+
+        paths = batch.collect_resume_paths(args.batch)
+        root = batch.batch_root(args.batch)
+        try:
+            batch.get_output_filenames(paths, root)
+        except ValueError as e:
+            logging.error(str(e))
+            sys.exit(2)
+
+        if args.queue:
+            import workqueue
 
-    args = sys.argv
-    if len(args) - 1 == 2:
-        data = parse_json(Path(args[1]))
-        output_filename = args[2]
+            results = workqueue.drain(
+                paths, args.jobs, config_overrides, Path(args.queue), args.lease, root
+            )
+        else:
+            results = batch.build_batch(paths, args.jobs, config_overrides, root)
+        sys.exit(0 if all(result.ok for result in results) else 1)
 
-    elif len(args) - 1 == 1:
-        data = parse_json(Path(args[1]))
-        output_filename = args[1].split("/")[1].split(".")[0]
+    if args.serve:
+        import server
 
-    create_resume_(data, output_filename)
+        server.serve(args.host, args.port, args.jobs, args.queue_size)
+        return
+
+    from resume import model
+
+    output_filename = args.output_filename or get_output_filename(args.path)
+    try:
+        check_output_filename(output_filename)
+    except ValueError as e:
+        logging.error(str(e))
+        sys.exit(2)
+
+    if args.watch:
+        import watch
+
+        watch.watch(Path(args.path), output_filename)
+        return
+
+    if args.variants:
+        import variants
+
+        try:
+            results = variants.build_variants(
+                Path(args.path), Path(args.variants), output_filename, args.jobs
+            )
+        except model.ValidationError as e:
+            logging.error(f"invalid resume {args.path}: {e}")
+            sys.exit(2)
+
+        except ValueError as e:
+            logging.error(f"invalid variant spec {args.variants}: {e}")
+            sys.exit(2)
+
+        sys.exit(0 if all(result.ok for result in results.values()) else 1)
+
+    try:
+        data = load_resume(Path(args.path))
+    except json.JSONDecodeError as e:
+        logging.error(f"invalid json {args.path}: {e}")
+        sys.exit(2)
+    except model.ValidationError as e:
+        logging.error(f"invalid resume {args.path}: {e}")
+        sys.exit(2)
+
+    if args.templates:
+        available = template_dirs()
+        names = list(available) if "all" in args.templates else args.templates
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            logging.error(f"unknown templates {unknown}, available: {list(available)}")
+            sys.exit(2)
+
+        results = create_resume_templates(
+            data, output_filename, {name: available[name] for name in names}, args.jobs
+        )
+        sys.exit(0 if all(result.ok for result in results.values()) else 1)
+
+    sys.exit(0 if create_resume_(data, output_filename).ok else 1)
 
 
 if __name__ == "__main__":
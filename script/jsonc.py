@@ -0,0 +1,73 @@
+"""JSON with comments, accepting what commentjson accepts
+
+`//`, `#` and `/* */` comments and trailing commas are removed in a single
+regex pass that skips over string literals, the rest is decoded by the C
+accelerated `json` module. Files without comments are decoded directly.
+"""
+import json
+import re
+from typing import IO, Any
+
+STRIP_RE = re.compile(
+    r"""
+    ("[^"\\\n]*(?:\\.[^"\\\n]*)*")                      # string literal, kept
+    | (/\*.*?\*/)                                       # block comment
+    | (?://|\#)[^\n]*                                   # line comment
+    | ,(?=(?:\s|//[^\n]*|\#[^\n]*|/\*.*?\*/)*[\]}])     # trailing comma
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+# a string literal, skipped, or a constant
+CONSTANT_RE = re.compile(r'("[^"\\\n]*(?:\\.[^"\\\n]*)*")|-?Infinity|NaN')
+
+
+class _ConstantError(Exception):
+    pass
+
+
+def _replace(match: re.Match) -> str:
+    string, block_comment = match.groups()
+    if string is not None:
+        return string
+    if block_comment is not None:
+        # keep line numbers of decode errors pointing at the source
+        return " " + "\n" * block_comment.count("\n")
+    return ""
+
+
+def _reject_constant(name: str) -> None:
+    raise _ConstantError(name)
+
+
+def _constant_error(name: str, text: str) -> json.JSONDecodeError:
+    """decode error at the first `name` outside a string literal of `text`"""
+    pos = next(
+        (match.start() for match in CONSTANT_RE.finditer(text) if match.group() == name), 0
+    )
+    return json.JSONDecodeError(f"Invalid JSON constant {name}", text, pos)
+
+
+def strip(text: str) -> str:
+    """`text` with comments and trailing commas removed"""
+    return STRIP_RE.sub(_replace, text)
+
+
+def loads(text: str) -> Any:
+    """decoded `text`, raises json.JSONDecodeError for invalid input"""
+    # NaN and Infinity are not JSON, commentjson rejects them as well
+    try:  # plain json needs no stripping, comments usually fail the decode early
+        return json.loads(text, parse_constant=_reject_constant)
+    except json.JSONDecodeError:
+        pass
+    except _ConstantError as e:
+        raise _constant_error(str(e), text) from None
+
+    text = strip(text)
+    try:
+        return json.loads(text, parse_constant=_reject_constant)
+    except _ConstantError as e:
+        raise _constant_error(str(e), text) from None
+
+
+def load(fp: IO[str]) -> Any:
+    return loads(fp.read())
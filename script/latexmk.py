@@ -0,0 +1,130 @@
+"""non-interactive latexmk runs with a watchdog on the TeX output
+
+latexmk runs with `-interaction=nonstopmode -halt-on-error -file-line-error`
+in its own process group. Its output is parsed line by line while it runs, on
+the first fatal error the whole group (latexmk and the engine) is killed
+instead of waiting for the run to end or the timeout to expire.
+"""
+import logging
+import os
+import re
+import signal
+import subprocess
+import threading
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import config
+
+LATEXMK_ARGS = ["-xelatex", "-interaction=nonstopmode", "-halt-on-error", "-file-line-error"]
+
+# ./resume.tex:12: Undefined control sequence.
+FILE_LINE_ERROR_RE = re.compile(r"^(?P<file>[^\s:][^:]*\.\w+):(?P<line>\d+): (?P<message>.+)$")
+# ! LaTeX Error: File `foo.sty' not found.
+BANG_ERROR_RE = re.compile(r"^! (?P<message>.+)$")
+# l.12 \foo
+CONTEXT_LINE_RE = re.compile(r"^l\.(?P<line>\d+) ")
+
+
+class TexError(NamedTuple):
+    file: Optional[str]
+    line: Optional[int]
+    message: str
+
+    def __str__(self) -> str:
+        location = f"{self.file}:{self.line}: " if self.file else ""
+        return location + self.message
+
+
+class LatexmkResult(NamedTuple):
+    ok: bool
+    errors: List[TexError]
+    output: str
+    timed_out: bool = False
+
+
+def parse_error_line(line: str) -> Optional[TexError]:
+    match = FILE_LINE_ERROR_RE.match(line)
+    if match:
+        return TexError(match["file"], int(match["line"]), match["message"].strip())
+
+    match = BANG_ERROR_RE.match(line)
+    if match:
+        return TexError(None, None, match["message"].strip())
+
+    return None
+
+
+class Watchdog:
+    """reads the output of `process`, killing it on the first fatal error"""
+
+    def __init__(self, process: subprocess.Popen) -> None:
+        self.process = process
+        self.errors: List[TexError] = []
+        self.lines: List[str] = []
+        self.killed = False
+        self.thread = threading.Thread(target=self.read, daemon=True)
+
+    def read(self) -> None:
+        for line in self.process.stdout:
+            line = line.rstrip("\n")
+            self.lines.append(line)
+
+            context = CONTEXT_LINE_RE.match(line)
+            if context and self.errors and self.errors[-1].line is None:
+                # `! message` errors are followed by `l.<line>` with the location
+                self.errors[-1] = self.errors[-1]._replace(line=int(context["line"]))
+                continue
+
+            error = parse_error_line(line)
+            if error is not None:
+                self.errors.append(error)
+                if not self.killed:
+                    self.kill()
+
+    def kill(self) -> None:
+        self.killed = True
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def run_latexmk(
+    cwd: Path, extra_args: List[str] = (), timeout: float = None, tex_file: str = "resume.tex"
+) -> LatexmkResult:
+    timeout = config.LATEXMK_TIMEOUT if timeout is None else timeout
+    process = subprocess.Popen(
+        ["latexmk", *LATEXMK_ARGS, *extra_args, tex_file],
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        start_new_session=True,  # own process group, so the engine is killed too
+    )
+    watchdog = Watchdog(process)
+    watchdog.thread.start()
+
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        watchdog.kill()
+        process.wait()
+
+    # the reader ends once every process holding the pipe is gone
+    watchdog.thread.join(timeout=1)
+    output = "\n".join(watchdog.lines)
+
+    if watchdog.errors:
+        logging.error(f"latexmk stopped on first error: {watchdog.errors[0]}")
+    elif timed_out:
+        logging.error(f"latexmk timed out after {timeout}s")
+    elif process.returncode != 0:
+        logging.error(f"latexmk exited with status {process.returncode}")
+
+    ok = process.returncode == 0 and not watchdog.errors and not timed_out
+    return LatexmkResult(ok, watchdog.errors, output, timed_out)
@@ -0,0 +1,145 @@
+import functools
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+import builddir
+import config
+import staging
+
+FORMAT_NAME = "resume-preamble"
+
+# everything before meta.tex is loaded is static, later parts depend on the
+# generated files (hyperref metadata) or on fonts that xetex can not dump
+SPLIT_RE = re.compile(r"^[ \t]*\\input\{\./meta(?:\.tex)?\}", re.MULTILINE)
+# packages loading OpenType fonts under xetex (fontawesome5 through fontspec),
+# a format with a native font loaded can not be dumped, they move to the body
+NATIVE_FONT_PACKAGE_RE = re.compile(
+    r"\\usepackage\s*(?:\[[^\]]*\])?\s*\{(?:fontspec|fontawesome5|unicode-math|polyglossia)\}"
+)
+
+
+class PreambleFormat(NamedTuple):
+    fmt_path: Path
+    body: str  # resume.tex without the dumped preamble
+
+
+def split_preamble(resume_tex: str) -> Optional[Tuple[str, str]]:
+    """split resume.tex into the static preamble and the rest, None if the
+    template has no static preamble that can be dumped"""
+    match = SPLIT_RE.search(resume_tex)
+    if not match or "\\documentclass" not in resume_tex[: match.start()]:
+        return None
+
+    static_preamble = resume_tex[: match.start()]
+    font_packages = NATIVE_FONT_PACKAGE_RE.findall(static_preamble)
+    static_preamble = NATIVE_FONT_PACKAGE_RE.sub("", static_preamble)
+    body = "".join(f"{package}\n" for package in font_packages) + resume_tex[match.start() :]
+    return static_preamble, body
+
+
+@functools.lru_cache(maxsize=None)
+def engine_fingerprint() -> str:
+    """formats are only valid for the engine build that dumped them"""
+    engine = shutil.which("xelatex")
+    if engine is None:
+        return ""
+
+    return f"{engine}:{os.stat(engine).st_mtime_ns}"
+
+
+def format_key(static_preamble: str) -> str:
+    sha = hashlib.sha256(static_preamble.encode("utf-8"))
+    sha.update(engine_fingerprint().encode("utf-8"))
+    return sha.hexdigest()
+
+
+def dump_format(static_preamble: str, fmt_path: Path) -> None:
+    """dump `static_preamble` into a xelatex format at `fmt_path`"""
+    with tempfile.TemporaryDirectory() as td:
+        temp_path = Path(td)
+        temp_path.joinpath("preamble.tex").write_text(static_preamble + "\n\\dump\n")
+
+        subprocess.run(
+            [
+                "xelatex",
+                "-ini",
+                "-interaction=batchmode",
+                f"-jobname={FORMAT_NAME}",
+                "&xelatex",
+                "preamble.tex",
+            ],
+            cwd=temp_path,
+            capture_output=True,
+            check=True,
+            timeout=config.LATEXMK_TIMEOUT,
+        )
+
+        staging.publish(temp_path.joinpath(f"{FORMAT_NAME}.fmt"), fmt_path, link=False)
+
+
+def get_format(template_dir: Path) -> Optional[PreambleFormat]:
+    """format for the template's static preamble, dumped once per preamble hash,
+    None if the template should be compiled normally"""
+    resume_tex = template_dir.joinpath("resume.tex").read_text()
+    parts = split_preamble(resume_tex)
+    if parts is None:
+        logging.warning(f"no static preamble found in {template_dir.name}, compiling normally")
+        return None
+
+    static_preamble, body = parts
+    fmt_path = config.PREAMBLE_FORMAT_DIR.joinpath(
+        format_key(static_preamble), f"{FORMAT_NAME}.fmt"
+    )
+
+    # a failed dump is not retried for the same preamble and engine
+    failed_path = fmt_path.with_name(f"{FORMAT_NAME}.failed")
+    if failed_path.exists():
+        logging.info(f"preamble format of {template_dir.name} failed before, compiling normally")
+        return None
+
+    if fmt_path.exists():
+        return PreambleFormat(fmt_path, body)
+
+    # one dump per format, threads and processes building the same template wait for it
+    with builddir.locked(builddir.lock_path(fmt_path)):
+        if failed_path.exists():
+            logging.info(f"preamble format of {template_dir.name} failed, compiling normally")
+            return None
+        if fmt_path.exists():
+            return PreambleFormat(fmt_path, body)
+
+        try:
+            dump_format(static_preamble, fmt_path)
+            logging.info(f"dumped preamble format for {template_dir.name}")
+
+        except subprocess.CalledProcessError as e:
+            # xelatex can not dump this preamble, that does not change until it does
+            logging.warning(f"could not dump preamble format, compiling normally:\n{e}")
+            try:
+                failed_path.write_text(f"{e}\n{e.stdout.decode('utf-8', 'replace')}")
+            except OSError:
+                pass
+            return None
+
+        except (OSError, subprocess.SubprocessError) as e:  # retried by the next build
+            logging.warning(f"could not dump preamble format, compiling normally:\n{e}")
+            return None
+
+    return PreambleFormat(fmt_path, body)
+
+
+def stage_format(preamble_format: PreambleFormat, dest_dir: Path) -> None:
+    """replace resume.tex in `dest_dir` with the body compiled against the format"""
+    staging.link_or_copy(preamble_format.fmt_path, dest_dir.joinpath(f"{FORMAT_NAME}.fmt"))
+    dest_dir.joinpath("resume.tex").write_text(preamble_format.body)
+
+
+def latexmk_args() -> List[str]:
+    return ["-e", f"$xelatex=q/xelatex -fmt={FORMAT_NAME} %O %S/"]
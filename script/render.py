@@ -0,0 +1,90 @@
+"""in-memory rendering, the LaTeX of a resume without a build
+
+    import render
+    tex = render.render_tex(data, "colorstrip")
+    tex.meta, tex.content       # meta.tex and content.tex
+    render.is_cached(tex)       # pdf already in the build cache?
+
+`render_tex` returns the generated files as strings, `stream_tex` writes them
+to file-like objects fragment by fragment. Neither creates a build directory,
+stages the template or assets, nor writes to out/. The only file read is
+social_profiles.json, once per process into a registry of its own, edits to it
+are not picked up (the CLI and watch mode, which use the watched registry, do
+pick them up). Rendered entries go through the in-memory
+fragment cache, and the sqlite fragment store if `config.USE_FRAGMENT_STORE`.
+"""
+import hashlib
+from pathlib import Path
+from typing import NamedTuple, Optional, TextIO, Union
+
+import cache
+import config
+import create
+import staging
+from resume import model
+from resume.sections import RenderContext
+from resume.social_profiles import get_social_profiles
+
+
+class RenderedTex(NamedTuple):
+    meta: str
+    content: str
+    template_dir: Path
+
+
+def template_path(template: Union[str, Path, None] = None) -> Path:
+    """template directory of a template name (`colorstrip`) or path, without
+    checking that it exists"""
+    if template is None:
+        return config.TEMPLATE_DIR
+    if isinstance(template, str) and "/" not in template:
+        return config.TEMPLATE_DIR.parent.joinpath(f"template_{template}")
+    return Path(template)
+
+
+def prepare(data: dict, validate: bool) -> dict:
+    return model.validate(data).to_dict() if validate else data
+
+
+def render_context() -> RenderContext:
+    """context of one render, social profiles are not stat-ed after the first load"""
+    return RenderContext(get_social_profiles(watch=False))
+
+
+def render_tex(
+    data: dict, template: Union[str, Path, None] = None, validate: bool = True
+) -> RenderedTex:
+    """meta.tex and content.tex of a parsed resume, raises model.ValidationError
+    if `validate` and the resume is invalid. `template` is a name or a template
+    directory, config.TEMPLATE_DIR by default"""
+    data = prepare(data, validate)
+    meta_text = create.create_metadata(data, render_context())
+    return RenderedTex(meta_text, "".join(create.iter_content(data)), template_path(template))
+
+
+def stream_tex(
+    data: dict, meta_file: Optional[TextIO], content_file: TextIO, validate: bool = True
+) -> None:
+    """write meta.tex to `meta_file` (skipped if None) and content.tex to
+    `content_file` section by section, without holding content.tex in memory"""
+    data = prepare(data, validate)
+    meta_text = create.create_metadata(data, render_context())
+    if meta_file is not None:
+        meta_file.write(meta_text)
+
+    for fragment in create.iter_content(data):
+        content_file.write(fragment)
+
+
+def cache_key(tex: RenderedTex) -> str:
+    """build cache key of the pdf of `tex`, reads (memoized) template and asset digests"""
+    assets = staging.required_assets(tex.template_dir, tex.meta)
+    content_digest = hashlib.sha256(tex.content.encode("utf-8")).digest()
+    return cache.BuildCache.key(
+        content_digest, tex.meta, tex.template_dir, assets, config.ASSETS_DIR
+    )
+
+
+def is_cached(tex: RenderedTex) -> bool:
+    """whether the build cache holds the pdf of `tex`, nothing is written"""
+    return cache.get_build_cache().contains(cache_key(tex))
@@ -0,0 +1,41 @@
+"""LaTeX escaping, same output as `pylatex.escape_latex` without importing pylatex"""
+import re
+
+# pylatex.utils._latex_special_chars
+LATEX_SPECIAL_CHARS = {
+    "&": r"\&",
+    "%": r"\%",
+    "$": r"\$",
+    "#": r"\#",
+    "_": r"\_",
+    "{": r"\{",
+    "}": r"\}",
+    "~": r"\textasciitilde{}",
+    "^": r"\^{}",
+    "\\": r"\textbackslash{}",
+    "\n": "\\newline%\n",
+    "-": r"{-}",
+    "\xa0": "~",
+    "[": r"{[}",
+    "]": r"{]}",
+}
+
+TRANSLATION_TABLE = str.maketrans(LATEX_SPECIAL_CHARS)
+# most text has nothing to escape, searching is cheaper than translating
+SPECIAL_CHARS_RE = re.compile("[" + re.escape("".join(LATEX_SPECIAL_CHARS)) + "]")
+
+
+class NoEscape(str):
+    """text that is already LaTeX, returned unchanged by `escape_latex`"""
+
+
+def escape_latex(s) -> NoEscape:
+    """escape characters that are special in LaTeX, `s` is converted with `str`"""
+    if isinstance(s, NoEscape):
+        return s
+
+    s = str(s)
+    if SPECIAL_CHARS_RE.search(s) is None:
+        return NoEscape(s)
+
+    return NoEscape(s.translate(TRANSLATION_TABLE))
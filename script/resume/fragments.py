@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+import config
+
+if TYPE_CHECKING:  # sqlite3 is imported on first use of the store
+    import sqlite3
+
+# modules whose code decides the text of a fragment: the entry renderers and
+# their inline templates, latex escaping and the social profile lookup
+RENDERER_SOURCES = ("sections.py", "escape.py", "social_profiles.py")
+
+# fragments rendered by an older version of the renderers must not be reused
+RENDERER_VERSION = hashlib.sha256(
+    b"".join(
+        hashlib.sha256(Path(__file__).with_name(name).read_bytes()).digest()
+        for name in RENDERER_SOURCES
+    )
+).hexdigest()
+
+
+def options_dict(entry_cls: type) -> dict:
+    options = getattr(entry_cls, "options", None)
+    if options is None:
+        return {}
+
+    return {name: value for name, value in vars(options).items() if not name.startswith("_")}
+
+
+class FragmentCache:
+    """memoizes rendered LaTeX fragments of single entries, keyed by a stable
+    hash of the entry data, the entry class options and the `is_ending` flag.
+
+    An in-memory LRU of `max_entries` is backed by an optional sqlite store so
+    fragments survive between runs.
+    """
+
+    def __init__(self, max_entries: int, store_path: Union[str, Path, None] = None) -> None:
+        self.max_entries = max_entries
+        self.store_path = Path(store_path) if store_path else None
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.connection: "Optional[sqlite3.Connection]" = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(entry_cls: type, data: dict, is_ending: Optional[bool], extra: Any = None) -> str:
+        payload = [
+            RENDERER_VERSION,
+            entry_cls.__qualname__,
+            data,
+            options_dict(entry_cls),
+            is_ending,
+            extra,
+        ]
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get_store(self) -> "Optional[sqlite3.Connection]":
+        if self.store_path is None:
+            return None
+
+        if self.connection is None:
+            import sqlite3
+
+            self.store_path.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(
+                self.store_path, timeout=config.TIMEOUT, check_same_thread=False
+            )
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=OFF")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS fragments (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+        return self.connection
+
+    def get(self, key: str) -> Any:
+        """cached value for `key`, None on miss"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+
+            value = None
+            store = self.get_store()
+            if store is not None:
+                row = store.execute("SELECT value FROM fragments WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self.lock:
+            self._remember(key, value)
+
+            store = self.get_store()
+            if store is not None:
+                try:
+                    with store:
+                        store.execute(
+                            "INSERT OR REPLACE INTO fragments (key, value) VALUES (?, ?)",
+                            (key, json.dumps(value)),
+                        )
+
+                except store.Error as e:
+                    logging.warning(f"could not persist fragment: {e!r}")
+
+    def _remember(self, key: str, value: Any) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+_fragment_cache: Optional[FragmentCache] = None
+
+
+def get_fragment_cache() -> FragmentCache:
+    global _fragment_cache
+    if _fragment_cache is None:
+        store_path = config.FRAGMENT_STORE_PATH if config.USE_FRAGMENT_STORE else None
+        _fragment_cache = FragmentCache(config.FRAGMENT_CACHE_SIZE, store_path)
+
+    return _fragment_cache
@@ -0,0 +1,308 @@
+"""validated resume model
+
+`validate` checks a parsed JSON Resume document in one pass, collecting every
+problem instead of stopping at the first, and converts it into compact typed
+records (NamedTuples, `__slots__ = ()`). Optional fields are normalised to
+empty values, so the renderers never see None for a field they format.
+"""
+from datetime import datetime
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+DATE_FMT = "%Y-%m-%d"
+SECTION_NAMES = ("experience", "education", "technical_skill", "project", "achievement")
+DEFAULT_ORDER = SECTION_NAMES
+
+
+class ValidationError(ValueError):
+    def __init__(self, errors: List[str]) -> None:
+        super().__init__(f"{len(errors)} problem(s) in resume:\n" + "\n".join(errors))
+        self.errors = errors
+
+
+class Profile(NamedTuple):
+    network: str
+    username: str
+    url: str
+
+
+class Basics(NamedTuple):
+    name: str
+    label: str
+    email: str
+    phone: str
+    phoneFormat: str
+    summary: str
+    profiles: Tuple[Profile, ...]
+
+
+class Meta(NamedTuple):
+    main_color: str
+    sec_color: str
+    order: Tuple[str, ...]
+
+
+class Work(NamedTuple):
+    company: str
+    position: str
+    website: str
+    location: str
+    startDate: str
+    endDate: str
+    summary: str
+    highlights: Tuple[str, ...]
+
+
+class Education(NamedTuple):
+    institution: str
+    area: str
+    studyType: str
+    url: str
+    location: str
+    startDate: str
+    endDate: str
+    summary: str
+    highlights: Tuple[str, ...]
+
+
+class Project(NamedTuple):
+    name: str
+    description: str
+    url: str
+    type: str
+    startDate: str
+    endDate: str
+    keywords: Tuple[str, ...]
+    highlights: Tuple[str, ...]
+
+
+class Skill(NamedTuple):
+    name: str
+    level: str
+    keywords: Tuple[str, ...]
+
+
+class Award(NamedTuple):
+    title: str
+    date: str
+
+
+class Resume(NamedTuple):
+    meta: Meta
+    basics: Basics
+    work: Tuple[Work, ...]
+    education: Tuple[Education, ...]
+    projects: Tuple[Project, ...]
+    skills: Tuple[Skill, ...]
+    awards: Tuple[Award, ...]
+
+    def to_dict(self) -> dict:
+        """plain JSON Resume dict of the normalised data, the renderers' input"""
+        return to_plain(self)
+
+
+def to_plain(value: Any) -> Any:
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        return {name: to_plain(item) for name, item in zip(value._fields, value)}
+    if isinstance(value, tuple):
+        return [to_plain(item) for item in value]
+    return value
+
+
+class Checker:
+    """reads fields of raw dicts, recording a message per problem"""
+
+    def __init__(self) -> None:
+        self.errors: List[str] = []
+
+    def error(self, path: str, message: str) -> None:
+        self.errors.append(f"{path}: {message}")
+
+    def string(self, data: dict, key: str, path: str, required: bool = False) -> str:
+        value = data.get(key)
+        if value is None or (required and value == ""):
+            if required:
+                self.error(f"{path}.{key}", "missing")
+            return ""
+
+        if not isinstance(value, str):
+            self.error(f"{path}.{key}", f"expected a string, got {type(value).__name__}")
+            return ""
+
+        return value
+
+    def date(self, data: dict, key: str, path: str) -> str:
+        value = self.string(data, key, path, required=True)
+        if value:
+            try:
+                datetime.strptime(value, DATE_FMT)
+            except ValueError:
+                self.error(f"{path}.{key}", f"{value!r} is not a YYYY-MM-DD date")
+
+        return value
+
+    def strings(self, data: dict, key: str, path: str) -> Tuple[str, ...]:
+        value = data.get(key)
+        if value is None:
+            return ()
+
+        if not isinstance(value, list):
+            self.error(f"{path}.{key}", f"expected a list, got {type(value).__name__}")
+            return ()
+
+        for idx, item in enumerate(value):
+            if not isinstance(item, str):
+                self.error(f"{path}.{key}[{idx}]", f"expected a string, got {type(item).__name__}")
+
+        return tuple(item for item in value if isinstance(item, str))
+
+    def entries(
+        self, data: dict, key: str, path: str, parse: Callable[[dict, str], Any]
+    ) -> Tuple[Any, ...]:
+        value = data.get(key)
+        if value is None:
+            return ()
+
+        if not isinstance(value, list):
+            self.error(f"{path}{key}", f"expected a list, got {type(value).__name__}")
+            return ()
+
+        records = []
+        for idx, entry in enumerate(value):
+            entry_path = f"{path}{key}[{idx}]"
+            if not isinstance(entry, dict):
+                self.error(entry_path, f"expected an object, got {type(entry).__name__}")
+                continue
+            records.append(parse(entry, entry_path))
+
+        return tuple(records)
+
+
+def parse_profile(c: Checker, data: dict, path: str) -> Profile:
+    return Profile(
+        network=c.string(data, "network", path),
+        username=c.string(data, "username", path),
+        url=c.string(data, "url", path),
+    )
+
+
+def parse_basics(c: Checker, data: Optional[dict]) -> Basics:
+    if not isinstance(data, dict):
+        c.error("basics", "missing" if data is None else "expected an object")
+        data = {}
+
+    return Basics(
+        name=c.string(data, "name", "basics", required=True),
+        label=c.string(data, "label", "basics"),
+        email=c.string(data, "email", "basics"),
+        phone=c.string(data, "phone", "basics"),
+        phoneFormat=c.string(data, "phoneFormat", "basics"),
+        summary=c.string(data, "summary", "basics"),
+        profiles=c.entries(data, "profiles", "basics.", lambda e, p: parse_profile(c, e, p)),
+    )
+
+
+def parse_meta(c: Checker, data: Optional[dict]) -> Meta:
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        c.error("meta", "expected an object")
+        data = {}
+
+    order = c.strings(data, "order", "meta") or DEFAULT_ORDER
+    for idx, name in enumerate(order):
+        if name not in SECTION_NAMES:
+            c.error(f"meta.order[{idx}]", f"unknown section {name!r}, one of {SECTION_NAMES}")
+
+    # `secn_color` is accepted as an alias of `sec_color`, as in MetaData.set_colors
+    sec_key = "sec_color" if "sec_color" in data else "secn_color"
+    return Meta(
+        main_color=c.string(data, "main_color", "meta") or "MaterialBlue",
+        sec_color=c.string(data, sec_key, "meta") or "MaterialGrey",
+        order=order,
+    )
+
+
+def parse_work(c: Checker, data: dict, path: str) -> Work:
+    return Work(
+        company=c.string(data, "company", path),
+        position=c.string(data, "position", path),
+        website=c.string(data, "website", path),
+        location=c.string(data, "location", path),
+        startDate=c.date(data, "startDate", path),
+        endDate=c.date(data, "endDate", path),
+        summary=c.string(data, "summary", path),
+        highlights=c.strings(data, "highlights", path),
+    )
+
+
+def parse_education(c: Checker, data: dict, path: str) -> Education:
+    return Education(
+        institution=c.string(data, "institution", path),
+        area=c.string(data, "area", path),
+        studyType=c.string(data, "studyType", path),
+        url=c.string(data, "url", path),
+        location=c.string(data, "location", path),
+        startDate=c.date(data, "startDate", path),
+        endDate=c.date(data, "endDate", path),
+        summary=c.string(data, "summary", path),
+        highlights=c.strings(data, "highlights", path),
+    )
+
+
+def parse_project(c: Checker, data: dict, path: str) -> Project:
+    return Project(
+        name=c.string(data, "name", path, required=True),
+        description=c.string(data, "description", path),
+        url=c.string(data, "url", path),
+        type=c.string(data, "type", path),
+        startDate=c.date(data, "startDate", path),
+        endDate=c.date(data, "endDate", path),
+        keywords=c.strings(data, "keywords", path),
+        highlights=c.strings(data, "highlights", path),
+    )
+
+
+def parse_skill(c: Checker, data: dict, path: str) -> Skill:
+    return Skill(
+        name=c.string(data, "name", path),
+        level=c.string(data, "level", path),
+        keywords=c.strings(data, "keywords", path),
+    )
+
+
+def parse_award(c: Checker, data: dict, path: str) -> Award:
+    return Award(
+        title=c.string(data, "title", path, required=True),
+        date=c.string(data, "date", path),
+    )
+
+
+def validate_meta(data: Any) -> Meta:
+    c = Checker()
+    meta = parse_meta(c, data)
+    if c.errors:
+        raise ValidationError(c.errors)
+
+    return meta
+
+
+def validate(data: Any) -> Resume:
+    """typed records of `data`, raises ValidationError listing every problem"""
+    c = Checker()
+    if not isinstance(data, dict):
+        raise ValidationError([f"resume: expected an object, got {type(data).__name__}"])
+
+    resume = Resume(
+        meta=parse_meta(c, data.get("meta")),
+        basics=parse_basics(c, data.get("basics")),
+        work=c.entries(data, "work", "", lambda e, p: parse_work(c, e, p)),
+        education=c.entries(data, "education", "", lambda e, p: parse_education(c, e, p)),
+        projects=c.entries(data, "projects", "", lambda e, p: parse_project(c, e, p)),
+        skills=c.entries(data, "skills", "", lambda e, p: parse_skill(c, e, p)),
+        awards=c.entries(data, "awards", "", lambda e, p: parse_award(c, e, p)),
+    )
+
+    if c.errors:
+        raise ValidationError(c.errors)
+
+    return resume
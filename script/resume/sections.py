@@ -1,12 +1,12 @@
-import json
 import logging
 import textwrap
-from typing import ClassVar, Dict, List
+from typing import ClassVar, Dict, Iterator, List
 from pathlib import Path
 from string import Template
 from datetime import datetime
-from pylatex import escape_latex
-import config
+from resume.escape import escape_latex
+from resume.fragments import get_fragment_cache
+from resume.social_profiles import SocialProfiles, get_social_profiles
 
 
 def fill_template(template: Template, values: dict, de_indent=True) -> str:
@@ -22,8 +22,217 @@ def fill_template(template: Template, values: dict, de_indent=True) -> str:
         return template.substitute(values)
 
 
+LINE_BREAKS = frozenset("\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029")  # str.splitlines
+
+
+def has_line_break(text: str) -> bool:
+    return not LINE_BREAKS.isdisjoint(text)
+
+
+def strip_lines(text: str) -> str:
+    """strip every line of `text` like fill_template, keeping a trailing line break"""
+    if not has_line_break(text):
+        return text.strip()
+
+    stripped = "\n".join(line.strip() for line in text.splitlines())
+    # a trailing \r joins the line break that follows the value into \r\n
+    return stripped + "\n" if text[-1] in LINE_BREAKS and text[-1] != "\r" else stripped
+
+
+class CompiledTemplate:
+    """template with the per line whitespace normalisation of fill_template
+    done once and compiled into a %-format string, `fill` gives the same output
+    as `fill_template` on the raw text with a single substitution.
+
+    Placeholders that fill a whole line get their value line-stripped, values of
+    inline placeholders only need the slow path if they span lines or carry
+    whitespace at a line edge.
+    """
+
+    def __init__(self, raw: str) -> None:
+        self.raw = Template(raw)
+        lines = [line.strip() for line in raw.splitlines()]
+        self.source = "\n".join(lines)
+
+        self.line_fields = set()
+        self.inline_fields = set()
+        self.edge_fields = set()
+        format_lines = []
+        for idx, line in enumerate(lines):
+            parts = []
+            last = 0
+            for match in Template.pattern.finditer(line):
+                parts.append(line[last : match.start()].replace("%", "%%"))
+                last = match.end()
+
+                name = match.group("named") or match.group("braced")
+                if name is None:  # $$ escape
+                    parts.append("$")
+                    continue
+
+                parts.append(f"%({name})s")
+                # the last line has no line break after it to keep a value's trailing one
+                if match.span() == (0, len(line)) and idx < len(lines) - 1:
+                    self.line_fields.add(name)
+                else:
+                    self.inline_fields.add(name)
+                    if match.start() == 0 or match.end() == len(line):
+                        self.edge_fields.add(name)
+
+            parts.append(line[last:].replace("%", "%%"))
+            format_lines.append("".join(parts))
+
+        self.line_fields -= self.inline_fields
+        self.format = "\n".join(format_lines)
+
+    def fill(self, values: dict) -> str:
+        for name in self.inline_fields:
+            value = values[name]
+            if not isinstance(value, str):
+                value = str(value)
+            if has_line_break(value) or (name in self.edge_fields and value != value.strip()):
+                return fill_template(self.raw, values)
+
+        if self.line_fields:
+            values = dict(values)
+            for name in self.line_fields:
+                value = str(values[name])
+                if value.endswith("\r"):  # may join the template's line break into \r\n
+                    return fill_template(self.raw, values)
+                values[name] = strip_lines(value)
+
+        return self.format % values
+
+
+TEMPLATES: Dict[str, CompiledTemplate] = {
+    name: CompiledTemplate(raw)
+    for name, raw in {
+        "meta": """
+            \\newcommand{\\AuthorName}{$name}
+            \\newcommand{\\PositionName}{$position}
+            \\newcommand{\\email}{$email}
+            \\newcommand{\\phone}{$phone}
+            \\newcommand{\\PhoneFormatted}{$phone_fmt}
+            
+            \\newcommand{\\maincolor}{$main_color}
+            \\newcommand{\\seccolor}{$secn_color}
+        """,
+        "profile_link": """\
+            $command
+            {$color}
+            {$network}
+            {$url}
+            {$username}
+            """,
+        "profile_links": textwrap.dedent(
+            """\
+            \\newcommand{\\InsertProfileLinks}
+            {
+            \\begin{center}
+            $links
+            \\end{center}
+            }    
+            """
+        ),
+        "experience": """\
+            \\Experience
+            {$position}
+            {$location}
+            {$work_place}
+            {$start to $end}
+            """,
+        "experience_highlights": """\
+            \\begin{itemize}
+            \t$highlights  
+            \\end{itemize}
+            """,
+        "education": """\
+            \\Education
+            {$studyType}
+            {$location}
+            {$institution}
+            {$start to $end}
+            """,
+        "education_highlights": textwrap.dedent(
+            """\
+            \\begin{itemize}
+            $highlights  
+            \\end{itemize}
+            """
+        ),
+        "project": """\
+            \\Project
+            {$name}
+            {$domain_name}
+            {$start to $end}
+            {$url}
+            {$keywords}
+            """,
+        "project_highlights": """\
+            \\begin{itemize}
+            \t$highlights
+            \\end{itemize}
+            """,
+    }.items()
+}
+
+SKILL_TEMPLATE = Template("\\ItemSkill{$name} $items\n")
+
+META_TEXT_AFTER = textwrap.dedent(
+    """\
+    \n
+    \\newcommand{\\MainColorDark}{\\maincolor800}
+    \\newcommand{\\SecColorDark}{\\seccolor800}
+    \\newcommand{\\SecColorLight}{\\seccolor500}
+    \\renewcommand{\\maketitle}{\\ResumeHeader}
+    \n
+"""
+)
+
+
+class RenderContext:
+    """state of rendering one resume, the custom color commands its entries
+    need, each once and in order of first use, and the social profiles
+    registry its links are looked up in (the watched default registry unless
+    given). A new context per build keeps renders independent, in one process
+    or on several threads"""
+
+    def __init__(self, social_profiles: SocialProfiles = None) -> None:
+        self.color_commands: Dict[str, None] = {}  # ordered set
+        self.social_profiles = social_profiles or get_social_profiles()
+
+    def add_color_command(self, command: str) -> None:
+        self.color_commands.setdefault(strip_lines(command), None)
+
+
+def render_entry(
+    entry_cls: type, data: dict, is_ending: bool = None, extra=None, context: RenderContext = None
+) -> str:
+    """render a single entry through the fragment cache, custom color commands
+    of the entry (`color_commands` after to_latex) are cached with the fragment
+    and added to `context`, on a hit too. Entries with `takes_context` are
+    created with the context"""
+    fragment_cache = get_fragment_cache()
+    key = fragment_cache.key(entry_cls, data, is_ending, extra)
+
+    cached = fragment_cache.get(key)
+    if cached is None:
+        args = (data,) if is_ending is None else (data, is_ending)
+        if getattr(entry_cls, "takes_context", False):
+            args += (context,)
+        entry = entry_cls(*args)
+        cached = [entry.to_latex(), list(getattr(entry, "color_commands", ()))]
+        fragment_cache.put(key, cached)
+
+    filled, color_commands = cached
+    if context is not None:
+        for command in color_commands:
+            context.add_color_command(command)
+    return filled
+
+
 class MetaData:
-    colors: dict = {"main_color": "MaterialBlue", "secn_color": "MaterialGrey", "custom": []}
+    colors: ClassVar[dict] = {"main_color": "MaterialBlue", "secn_color": "MaterialGrey"}
 
     def __init__(self, data: dict) -> None:
         self.name = data.get("name")
@@ -45,10 +254,6 @@ class MetaData:
 
         if 'sec_color' in colors.keys():
             self.secn_color = colors.get("sec_color")
-        
-    @staticmethod
-    def add_custom_color_command(color_command: str):
-        MetaData.colors["custom"].append(color_command)
 
     def to_dict(self) -> dict:
         return {
@@ -61,18 +266,7 @@ class MetaData:
             "secn_color": self.secn_color,
         }
 
-    def to_latex(self) -> str:
-        template_str = """
-            \\newcommand{\\AuthorName}{$name}
-            \\newcommand{\\PositionName}{$position}
-            \\newcommand{\\email}{$email}
-            \\newcommand{\\phone}{$phone}
-            \\newcommand{\\PhoneFormatted}{$phone_fmt}
-            
-            \\newcommand{\\maincolor}{$main_color}
-            \\newcommand{\\seccolor}{$secn_color}
-        """
-        
+    def to_latex(self, context: RenderContext = None) -> str:
         summary_command = ""
         if self.summary:
             summary_command = "\\newcommand{\\SummaryText}\n{" + escape_latex(self.summary).strip() + "}"
@@ -80,25 +274,13 @@ class MetaData:
         else:
             summary_command = "\\newcommand{\\SummaryText}{ }"
         
-        if MetaData.colors["custom"]:
-            for command in MetaData.colors["custom"]:
-                command_str = f"{command}\n"
-                template_str += command_str
-
-        template = Template(template_str)
         data = self.to_dict()
-        filled_text = fill_template(template, data).strip()
-
-        text_to_include_after = """\
-            \n
-            \\newcommand{\\MainColorDark}{\\maincolor800}
-            \\newcommand{\\SecColorDark}{\\seccolor800}
-            \\newcommand{\\SecColorLight}{\\seccolor500}
-            \\renewcommand{\\maketitle}{\\ResumeHeader}
-            \n
-        """
-
-        filled_text += textwrap.dedent(text_to_include_after)
+        filled_text = TEMPLATES["meta"].fill(data)
+        if context is not None:
+            filled_text += "\n".join(context.color_commands)
+        filled_text = filled_text.strip()
+
+        filled_text += META_TEXT_AFTER
         filled_text += summary_command + "\n"
 
         return filled_text
@@ -114,7 +296,12 @@ class ProfileLinks:
             command: str = "\\ProfileLink"
             default_meta: dict = {"color": color, "command": command}
 
-        def __init__(self, data: dict, is_ending: bool = False) -> None:
+        takes_context: ClassVar[bool] = True
+
+        def __init__(
+            self, data: dict, is_ending: bool = False, context: RenderContext = None
+        ) -> None:
+            self.social_profiles = context.social_profiles if context else get_social_profiles()
             self.network = data.get("network", "").lower()
             self.username = escape_latex(data.get("username", ""))
             self.url = data.get("url", "")
@@ -128,27 +315,21 @@ class ProfileLinks:
                 "command": "",
             }
             self.is_ending = is_ending
+            self.color_commands: List[str] = []
 
         def get_meta(self) -> dict:
-            network = self.network
-            with open(config.SOCIAL_PROFILES_PATH, "r") as f:
-                data = json.load(f)
-
-            if network in data["custom_icons"].keys():
-                meta = data["custom_icons"][network]
-                return meta
-
-            elif network in data["fontawesome"].keys():
-                meta = data["fontawesome"][network]
-                if not meta:
-                    return self.default().default_meta
-                return meta
+            try:
+                meta = self.social_profiles.lookup(self.network)
 
-            else:
+            except KeyError:
                 raise KeyError(
                     f"Icon for `{self.network}` not found in LaTeX-FA5 or Custom Database"
                 )
 
+            if not meta:
+                return self.default().default_meta
+            return meta
+
         def to_latex(self) -> str:
             data = self.data
             try:
@@ -161,51 +342,38 @@ class ProfileLinks:
             for key in meta.keys():
                 data[key] = meta[key]
 
-            template = Template(
-                """\
-                $command
-                {$color}
-                {$network}
-                {$url}
-                {$username}
-                """
-            )
-
             if data.get("custom_color_command"):
-                MetaData.add_custom_color_command(data["custom_color_command"])
+                self.color_commands.append(data["custom_color_command"])
 
             logging.info(f"created ProfileLink for ({self.network})")
-            filled = fill_template(template, data)
+            filled = TEMPLATES["profile_link"].fill(data)
 
             if not self.is_ending:
                 filled += "\\LinkSep\n%\n"
 
             return filled
 
-    def __init__(self, profiles: List[dict]) -> None:
+    def __init__(self, profiles: List[dict], context: RenderContext = None) -> None:
         self.profiles = profiles
         self.last_idx = len(profiles) - 1
+        self.context = context
 
     def to_latex(self) -> str:
-        template = Template(
-            textwrap.dedent(
-                """\
-                \\newcommand{\\InsertProfileLinks}
-                {
-                \\begin{center}
-                $links
-                \\end{center}
-                }    
-                """
-            )
-        )
+        social_profiles = self.context.social_profiles if self.context else get_social_profiles()
+        social_profiles.refresh()
 
         links_text = ""
         for idx, profile in enumerate(self.profiles):
             is_last = idx == self.last_idx
-            links_text += self.profile_link(profile, is_last).to_latex()
+            links_text += render_entry(
+                self.profile_link,
+                profile,
+                is_last,
+                extra=social_profiles.mtime_ns,
+                context=self.context,
+            )
 
-        return fill_template(template, {"links": links_text})
+        return TEMPLATES["profile_links"].fill({"links": links_text})
 
 
 class Experience:
@@ -235,24 +403,6 @@ class Experience:
         def to_latex(self) -> str:
             config_ = self.options()
 
-            template = Template(
-                """\
-                \\Experience
-                {$position}
-                {$location}
-                {$work_place}
-                {$start to $end}
-                """
-            )
-
-            highlights_template = Template(
-                """\
-                \\begin{itemize}
-                \t$highlights  
-                \\end{itemize}
-                """
-            )
-
             work_place = (
                 "\\href{" + self.website + "}{" + self.company + "}"
                 if config_.link_website
@@ -267,13 +417,13 @@ class Experience:
                 "work_place": work_place,
             }
 
-            filled = fill_template(template, data)
+            filled = TEMPLATES["experience"].fill(data)
 
             if self.highlights:
                 highlights_text = "\n\t".join(
                     [f"\\item {escape_latex(item)}" for item in self.highlights]
                 )
-                filled += fill_template(highlights_template, {"highlights": highlights_text})
+                filled += TEMPLATES["experience_highlights"].fill({"highlights": highlights_text})
 
             if not self.is_ending:
                 filled += config_.seperator
@@ -288,13 +438,13 @@ class Experience:
         self.experience_entries = exp
         self.last_idx = len(exp) - 1
 
-    def to_latex(self) -> str:
-        filled = ""
+    def iter_latex(self) -> Iterator[str]:
         for idx, experience_entry in enumerate(self.experience_entries):
             is_last = idx == self.last_idx
-            filled += self.experience(experience_entry, is_last).to_latex()
+            yield render_entry(self.experience, experience_entry, is_last)
 
-        return filled
+    def to_latex(self) -> str:
+        return "".join(self.iter_latex())
 
 
 class Education:
@@ -324,25 +474,6 @@ class Education:
 
         def to_latex(self) -> str:
             config_ = self.options()
-            template = Template(
-                """\
-                \\Education
-                {$studyType}
-                {$location}
-                {$institution}
-                {$start to $end}
-                """
-            )
-
-            highlights_template = Template(
-                textwrap.dedent(
-                    """\
-                    \\begin{itemize}
-                    $highlights  
-                    \\end{itemize}
-                    """
-                )
-            )
 
             data = {
                 "end": self.end.strftime(config_.date_fmt),
@@ -352,13 +483,13 @@ class Education:
                 "institution": self.institution,
             }
 
-            filled = fill_template(template, data)
+            filled = TEMPLATES["education"].fill(data)
 
             if self.highlights:
                 highlights_text = "\n".join(
                     [f"\\item {escape_latex(item)}" for item in self.highlights]
                 )
-                filled += fill_template(highlights_template, {"highlights": highlights_text})
+                filled += TEMPLATES["education_highlights"].fill({"highlights": highlights_text})
 
             if not self.is_ending:
                 filled += config_.seperator
@@ -373,13 +504,13 @@ class Education:
         self.education_entries = education
         self.last_idx = len(education) - 1
 
-    def to_latex(self) -> str:
-        filled = ""
+    def iter_latex(self) -> Iterator[str]:
         for idx, education_entry in enumerate(self.education_entries):
             is_last = idx == self.last_idx
-            filled += self.education(education_entry, is_last).to_latex()
+            yield render_entry(self.education, education_entry, is_last)
 
-        return filled
+    def to_latex(self) -> str:
+        return "".join(self.iter_latex())
 
 
 class Projects:
@@ -416,24 +547,6 @@ class Projects:
                     return "\n\t".join([f"\\item {i}" for i in x])
 
             config_ = self.options()
-            template = Template(
-                """\
-                \\Project
-                {$name}
-                {$domain_name}
-                {$start to $end}
-                {$url}
-                {$keywords}
-                """
-            )
-
-            highlights_template = Template(
-                """\
-                \\begin{itemize}
-                \t$highlights
-                \\end{itemize}
-                """
-            )
 
             data = {
                 "url": self.url,
@@ -444,13 +557,12 @@ class Projects:
                 "start": self.start.strftime(config_.date_fmt),
             }
 
-            highlights_data = {
-                "highlights": list_to_string_itemize(self.highlights),
-            }
-
-            filled = fill_template(template, data) + fill_template(
-                highlights_template, highlights_data
-            )
+            filled = TEMPLATES["project"].fill(data)
+            if self.highlights:  # an empty itemize is a LaTeX error
+                highlights_data = {
+                    "highlights": list_to_string_itemize(self.highlights),
+                }
+                filled += TEMPLATES["project_highlights"].fill(highlights_data)
 
             if not self.is_ending:
                 filled += config_.seperator
@@ -465,13 +577,13 @@ class Projects:
         self.projects = projects
         self.last_idx = len(projects) - 1
 
-    def to_latex(self) -> str:
-        filled = ""
+    def iter_latex(self) -> Iterator[str]:
         for idx, project in enumerate(self.projects):
             is_last = idx == self.last_idx
-            filled += self.project(project, is_last).to_latex()
+            yield render_entry(self.project, project, is_last)
 
-        return filled
+    def to_latex(self) -> str:
+        return "".join(self.iter_latex())
 
 
 class TechnicalSkills:
@@ -482,23 +594,25 @@ class TechnicalSkills:
             self.keywords = data.get("keywords", "")
 
         def to_latex(self):
-            template = Template("\\ItemSkill{$name} $items\n")
             data = {
                 "name": escape_latex(self.name),
                 "items": ", \\ ".join([i for i in self.keywords]),
             }
             logging.info(f"created TechSkills for ({self.name})")
-            return template.safe_substitute(data)
+            return SKILL_TEMPLATE.safe_substitute(data)
 
     def __init__(self, skills: List[dict]) -> None:
         self.skills = skills
 
-    def to_latex(self) -> str:
-        filled = "\\begin{ListSkills}\n"
+    def iter_latex(self) -> Iterator[str]:
+        yield "\\begin{ListSkills}\n"
         for skill in self.skills:
-            filled = filled + "\t" + self.Skill(skill).to_latex()
+            yield "\t" + render_entry(self.Skill, skill)
 
-        return filled + "\\end{ListSkills}\n"
+        yield "\\end{ListSkills}\n"
+
+    def to_latex(self) -> str:
+        return "".join(self.iter_latex())
 
 
 class Achievements:
@@ -512,10 +626,13 @@ class Achievements:
     def __init__(self, achvs: List[dict]) -> None:
         self.achvs = achvs
 
-    def to_latex(self) -> str:
-        filled = "\\begin{AchievementList}\n"
+    def iter_latex(self) -> Iterator[str]:
+        yield "\\begin{AchievementList}\n"
         for achv in self.achvs:
-            filled = filled + self.Achv(achv).to_latex()
+            yield render_entry(self.Achv, achv)
 
         logging.info(f"created {len(self.achvs)} Achievements")
-        return filled + "\\end{AchievementList}\n"
+        yield "\\end{AchievementList}\n"
+
+    def to_latex(self) -> str:
+        return "".join(self.iter_latex())
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import config
+
+
+class SocialProfiles:
+    """registry of social_profiles.json, parsed once into a single
+    `network -> meta` index and reloaded only when the file's mtime changes.
+
+    custom_icons take precedence over fontawesome, fontawesome entries without
+    metadata (null in the json) are indexed as None. With `watch` False the
+    file is read once and never stat-ed again.
+    """
+
+    def __init__(self, path: Union[str, Path], watch: bool = True) -> None:
+        self.path = Path(path)
+        self.index: Dict[str, Optional[dict]] = {}
+        self.mtime_ns: Optional[int] = None
+        self.watch = watch
+        self.lock = threading.Lock()
+
+    def refresh(self) -> None:
+        if not self.watch and self.mtime_ns is not None:
+            return
+
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if mtime_ns == self.mtime_ns:
+            return
+
+        with self.lock:
+            if mtime_ns == self.mtime_ns:
+                return
+
+            with open(self.path, "r") as f:
+                data = json.load(f)
+
+            index = dict(data["fontawesome"])
+            index.update(data["custom_icons"])
+
+            self.index = index
+            self.mtime_ns = mtime_ns
+            logging.info(f"loaded {len(index)} social profiles from {self.path}")
+
+    def lookup(self, network: str) -> Optional[dict]:
+        """metadata for `network`, None if it has no custom metadata,
+        raises KeyError if the network is unknown"""
+        self.refresh()
+        return self.index[network]
+
+
+_registries: Dict[Tuple[Path, bool], SocialProfiles] = {}
+
+
+def get_social_profiles(path: Union[str, Path, None] = None, watch: bool = True) -> SocialProfiles:
+    """shared registry of `path` (config.SOCIAL_PROFILES_PATH by default), a
+    watched and an unwatched registry of the same file are separate"""
+    path = Path(path or config.SOCIAL_PROFILES_PATH)
+    registry = _registries.get((path, watch))
+    if registry is None:
+        registry = _registries.setdefault((path, watch), SocialProfiles(path, watch))
+
+    return registry
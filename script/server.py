@@ -0,0 +1,264 @@
+"""asyncio http service rendering JSON Resume documents to pdf
+
+    POST /render?template=original   body: JSON Resume document -> application/pdf
+    GET  /health                      -> json with worker and queue counters
+
+Parsing, validation and rendering run on a small pool of
+`config.SERVICE_RENDER_WORKERS` threads, so a large document does not hold up
+the event loop, compiles run on a pool of `config.SERVICE_WORKERS` threads
+(latexmk is a subprocess, so threads are enough). At most
+`config.SERVICE_QUEUE_SIZE` requests wait for a free worker, further requests
+get a 503 with a Retry-After header instead of queueing without bound.
+
+For load tests put a stub latexmk on PATH that only touches resume.pdf.
+"""
+import asyncio
+import json
+import logging
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import config
+import create
+import jsonc
+import render
+from resume import model
+
+READ_TIMEOUT = 10
+MAX_HEADER_LINES = 100
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, headers: Dict[str, str] = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def compile_pdf(
+    meta_text: str, content_text: str, template_dir: Path
+) -> Tuple[create.BuildResult, Optional[bytes]]:
+    """compile into the service output directory, returns the build result
+    and the pdf bytes, None if latexmk failed"""
+    job_id = uuid.uuid4().hex
+    output_filename = f"{config.SERVICE_OUT_DIR.relative_to(config.OUT_DIR)}/{job_id}"
+    pdf_path = config.SERVICE_OUT_DIR.joinpath(f"{job_id}.pdf")
+    try:
+        result = create.compile_tex_file(content_text, meta_text, output_filename, template_dir)
+        return result, pdf_path.read_bytes() if result.ok else None
+
+    finally:
+        pdf_path.unlink(missing_ok=True)
+        config.SERVICE_OUT_DIR.joinpath(f"{job_id}.log").unlink(missing_ok=True)
+        shutil.rmtree(config.SERVICE_OUT_DIR.joinpath(job_id), ignore_errors=True)
+
+
+def render_request(body: bytes, template_dir: Path) -> render.RenderedTex:
+    """parse, validate and render a request body, raises json.JSONDecodeError,
+    UnicodeDecodeError or model.ValidationError for an invalid document"""
+    data = jsonc.loads(body.decode("utf-8"))
+    return render.render_tex(data, template_dir)
+
+
+class RenderService:
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self.render_executor = ThreadPoolExecutor(
+            max_workers=config.SERVICE_RENDER_WORKERS, thread_name_prefix="render"
+        )
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compile")
+        self.pending = 0  # requests rendering, compiling or waiting for a worker
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            method, target, _headers, body = await asyncio.wait_for(
+                read_request(reader), READ_TIMEOUT
+            )
+            status, content_type, payload, extra_headers = await self.dispatch(
+                method, target, body
+            )
+
+        except HttpError as e:
+            status, content_type, extra_headers = e.status, "application/json", e.headers
+            payload = json.dumps({"error": e.message}).encode("utf-8")
+
+        except asyncio.TimeoutError:
+            status, content_type, extra_headers = HTTPStatus.REQUEST_TIMEOUT, "text/plain", {}
+            payload = b"request timeout"
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        except Exception as e:
+            logging.exception("unhandled error in render service")
+            status, content_type, extra_headers = HTTPStatus.INTERNAL_SERVER_ERROR, "text/plain", {}
+            payload = repr(e).encode("utf-8")
+
+        try:
+            await write_response(writer, status, content_type, payload, extra_headers)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        if url.path == "/health":
+            if method != "GET":
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "use GET", {"Allow": "GET"})
+            return HTTPStatus.OK, "application/json", json.dumps(self.stats()).encode("utf-8"), {}
+
+        if url.path != "/render":
+            raise HttpError(HTTPStatus.NOT_FOUND, f"no route for {url.path}")
+        if method != "POST":
+            raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST", {"Allow": "POST"})
+
+        default_template = create.template_name(config.TEMPLATE_DIR)
+        template = parse_qs(url.query).get("template", [default_template])[0]
+        templates = create.template_dirs()
+        if template not in templates:
+            raise HttpError(
+                HTTPStatus.NOT_FOUND, f"unknown template {template!r}, one of {sorted(templates)}"
+            )
+
+        if self.pending >= self.capacity:
+            self.rejected += 1
+            raise HttpError(
+                HTTPStatus.SERVICE_UNAVAILABLE, "render queue is full", {"Retry-After": "1"}
+            )
+
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            try:
+                tex = await loop.run_in_executor(
+                    self.render_executor, render_request, body, templates[template]
+                )
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise HttpError(HTTPStatus.BAD_REQUEST, f"invalid json: {e}")
+            except model.ValidationError as e:
+                raise HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            except (KeyError, TypeError, AttributeError) as e:
+                raise HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, f"invalid resume: {e!r}")
+
+            result, pdf = await loop.run_in_executor(
+                self.executor, compile_pdf, tex.meta, tex.content, tex.template_dir
+            )
+        finally:
+            self.pending -= 1
+
+        if pdf is None:
+            self.failed += 1
+            message = "; ".join(["latexmk failed", *(str(error) for error in result.errors)])
+            raise HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, message)
+
+        self.completed += 1
+        return HTTPStatus.OK, "application/pdf", pdf, {}
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self.pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+async def read_request(reader: asyncio.StreamReader):
+    request_line = (await reader.readuntil(b"\r\n")).decode("latin-1").strip()
+    try:
+        method, target, _version = request_line.split(" ", 2)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = (await reader.readuntil(b"\r\n")).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "too many headers")
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "invalid content-length")
+    if length > config.SERVICE_MAX_BODY_BYTES:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def write_response(
+    writer: asyncio.StreamWriter,
+    status: HTTPStatus,
+    content_type: str,
+    payload: bytes,
+    headers: Dict[str, str],
+) -> None:
+    head = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(payload)}",
+        "Connection: close",
+        *(f"{name}: {value}" for name, value in headers.items()),
+    ]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + payload)
+    await writer.drain()
+
+
+async def serve_forever(host: str, port: int, workers: int, queue_size: int) -> None:
+    service = RenderService(workers, queue_size)
+    server = await asyncio.start_server(service.handle, host, port)
+    logging.info(
+        f"render service listening on http://{host}:{port} "
+        f"({workers} workers, queue of {queue_size})"
+    )
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.render_executor.shutdown(wait=False, cancel_futures=True)
+        service.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def serve(
+    host: str = None, port: int = None, workers: int = None, queue_size: int = None
+) -> None:
+    # only the pdf is returned, the generated tex would be deleted right away
+    config.KEEP_GENERATED_TEX = False
+    # every request has a new output name, a persistent directory would never be reused
+    config.USE_PERSISTENT_BUILD = False
+    config.SERVICE_OUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    try:
+        asyncio.run(
+            serve_forever(
+                host or config.SERVICE_HOST,
+                port or config.SERVICE_PORT,
+                workers or config.SERVICE_WORKERS,
+                config.SERVICE_QUEUE_SIZE if queue_size is None else queue_size,
+            )
+        )
+    except KeyboardInterrupt:
+        logging.info("render service stopped")
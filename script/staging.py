@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import List, Set
+
+import config
+
+# directories of the assets tree that are staged selectively, everything else
+# (photos etc.) is staged as a whole, except data used only by the python side
+FONTS_DIR = "fonts"
+ICONS_DIR = "icons"
+UNSTAGED_DIRS = ("data",)
+
+TEMPLATE_FILES = ("macros.tex", "resume.tex")
+
+FONT_COMMAND_RE = re.compile(
+    r"\\(?:set(?:main|sans|mono)font|newfontfamily\s*\\\w+|fontspec)\s*\{([^}]*)\}\s*\[([^\]]*)\]"
+)
+FONT_PATH_RE = re.compile(r"Path\s*=\s*\\FontPath\{([^}]*)\}")
+FONT_EXTENSION_RE = re.compile(r"Extension\s*=\s*(\.\w+)")
+FONT_FACE_RE = re.compile(r"\w*Font\s*=\s*\{?([^,{}\]]+?)\}?\s*(?:,|$)")
+ALT_PROFILE_LINK_RE = re.compile(r"\\AltProfileLink\*?\s*\{[^}]*\}\s*\{([^}]*)\}")
+
+
+def strip_tex_comments(text: str) -> str:
+    return "\n".join(re.sub(r"(?<!\\)%.*", "", line) for line in text.splitlines())
+
+
+def font_files(resume_tex: str, assets_dir: Path = config.ASSETS_DIR) -> Set[str]:
+    """asset paths (relative to `assets_dir`) of the font files loaded by
+    fontspec commands in a template's resume.tex, falls back to the whole font
+    directory when a computed file name does not exist"""
+    files = set()
+    for name, options in FONT_COMMAND_RE.findall(strip_tex_comments(resume_tex)):
+        path_match = FONT_PATH_RE.search(options)
+        if not path_match:  # system font, nothing to stage
+            continue
+
+        font_dir = f"{FONTS_DIR}/{path_match.group(1).strip()}"
+        ext_match = FONT_EXTENSION_RE.search(options)
+        extension = ext_match.group(1) if ext_match else ""
+
+        faces = [face.strip() for face in FONT_FACE_RE.findall(options)] or [name.strip()]
+        candidates = {f"{font_dir}/{face.replace('*', name.strip())}{extension}" for face in faces}
+
+        if all(assets_dir.joinpath(item).is_file() for item in candidates):
+            files |= candidates
+
+        else:
+            logging.warning(f"could not resolve font files for {name}, staging {font_dir}")
+            files |= {
+                path.relative_to(assets_dir).as_posix()
+                for path in assets_dir.joinpath(font_dir).rglob("*")
+                if path.is_file()
+            }
+
+    return files
+
+
+def icon_files(meta_text: str) -> Set[str]:
+    """asset paths of the icons used by rendered \\AltProfileLink entries"""
+    return {
+        f"{ICONS_DIR}/{network.strip()}.pdf" for network in ALT_PROFILE_LINK_RE.findall(meta_text)
+    }
+
+
+def required_assets(
+    template_dir: Path, meta_text: str, assets_dir: Path = config.ASSETS_DIR
+) -> List[str]:
+    """sorted asset paths (relative to `assets_dir`) needed to build with `template_dir`"""
+    resume_tex = template_dir.joinpath("resume.tex").read_text()
+    files = font_files(resume_tex, assets_dir) | icon_files(meta_text)
+
+    for path in assets_dir.rglob("*"):
+        relative = path.relative_to(assets_dir)
+        if path.is_file() and relative.parts[0] not in (FONTS_DIR, ICONS_DIR, *UNSTAGED_DIRS):
+            files.add(relative.as_posix())
+
+    return sorted(files)
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """hardlink `src` to `dst`, falling back to a symlink and then a copy,
+    an existing `dst` is replaced"""
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+
+    try:
+        os.symlink(src.resolve(), dst)
+        return
+    except OSError:
+        pass
+
+    shutil.copyfile(src, dst)
+
+
+def stage_assets(files: List[str], dest_dir: Path, assets_dir: Path = config.ASSETS_DIR) -> None:
+    """stage `files` from `assets_dir` into `dest_dir/assets`"""
+    staged_dir = dest_dir.joinpath("assets")
+    for item in files:
+        src = assets_dir.joinpath(item)
+        if not src.is_file():
+            logging.warning(f"asset {item} not found, skipping")
+            continue
+
+        dst = staged_dir.joinpath(item)
+        if dst.exists() and os.path.samefile(src, dst):  # reused build directory
+            continue
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        link_or_copy(src, dst)
+
+    logging.info(f"staged {len(files)} assets")
+
+
+def stage_template(template_dir: Path, dest_dir: Path) -> None:
+    """copy the template files into `dest_dir`, copied rather than linked as
+    resume.tex may be rewritten in the build directory"""
+    for name in TEMPLATE_FILES:
+        shutil.copyfile(template_dir.joinpath(name), dest_dir.joinpath(name))
+
+
+def temporary_sibling(dst: Path) -> Path:
+    return dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:12]}.tmp")
+
+
+def publish(src: Path, dst: Path, link: bool = True) -> None:
+    """publish a build product at `dst` atomically, hardlinked (copied if
+    `link` is False or linking fails) to a temporary name next to `dst` and
+    renamed over it. Readers see the old or the new file, never a partial one.
+    Only link files that are replaced, not rewritten in place, later"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temporary_sibling(dst)
+    try:
+        try:
+            if not link:
+                raise OSError
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def publish_text(text: str, dst: Path) -> None:
+    """write `text` to `dst` atomically"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = temporary_sibling(dst)
+    try:
+        tmp_path.write_text(text)
+        os.replace(tmp_path, dst)
+
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def file_sha256(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def write_manifest(job_dir: Path, artifacts: List[Path], **info) -> Path:
+    """write `job_dir/manifest.json` listing `artifacts` (paths relative to
+    config.OUT_DIR) with their sizes and sha256, written last and atomically,
+    so the listed files are complete once the manifest exists"""
+    manifest = {
+        **info,
+        "created": time.time(),
+        "artifacts": [
+            {
+                "path": path.relative_to(config.OUT_DIR).as_posix(),
+                "size": path.stat().st_size,
+                "sha256": file_sha256(path),
+            }
+            for path in artifacts
+        ],
+    }
+    manifest_path = job_dir.joinpath("manifest.json")
+    publish_text(json.dumps(manifest, indent=2) + "\n", manifest_path)
+    return manifest_path
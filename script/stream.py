@@ -0,0 +1,225 @@
+"""streamed builds of a JSONL export, one JSON Resume document per line
+
+    python3 script/create.py --stream export.jsonl -j 8
+    zcat export.jsonl.gz | python3 script/create.py --stream - export
+
+Documents may also be concatenated (pretty printed) JSON values. The file is
+read in chunks of `config.STREAM_CHUNK_SIZE` characters and decoded lazily, a
+reader thread puts documents into a queue of `config.STREAM_QUEUE_SIZE` per
+worker, the next document is only read once a worker is free. Memory is the
+queue plus the documents being built, independent of the size of the export.
+
+Document `n` (1-based) is built as `out/<prefix>-<n>.pdf`. A document that is
+not a valid JSON object is logged with its line and counted as invalid, reading
+resumes at the next line that starts with `{`.
+"""
+import io
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+import batch
+import config
+
+WHITESPACE = " \t\r\n"
+# a string literal, a character that changes the nesting depth of a value, or
+# the quote of a string literal that continues past the buffer
+TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]]|"')
+# after an invalid document reading resumes at the next line starting a top-level object
+RESYNC_RE = re.compile(r"\n(?=\{)")
+_END = object()
+
+
+class StreamSummary(NamedTuple):
+    documents: int
+    built: int
+    cached: int
+    failed: int
+    invalid: int
+    read_error: Optional[str] = None  # reading stopped early, later documents were not built
+
+
+def scan_value(buffer: str, pos: int, depth: int) -> Tuple[Optional[int], int, int]:
+    """continue scanning the value at the start of `buffer` from `pos` at
+    nesting `depth`, returns (end of the value or None if it continues past the
+    buffer, position and depth to resume from once more is read)"""
+    while True:
+        match = TOKEN_RE.search(buffer, pos)
+        if match is None:
+            return None, len(buffer), depth
+
+        start, pos = match.span()
+        char = buffer[start]
+        if char == '"':
+            if pos - start == 1:  # the string continues in the next chunk
+                return None, start, depth
+            continue
+
+        depth += 1 if char in "{[" else -1
+        if depth == 0:
+            return pos, pos, depth
+
+
+def iter_documents(
+    f: TextIO, chunk_size: int = None, max_document_size: int = None
+) -> Iterator[Tuple[int, Optional[dict]]]:
+    """(line, document) of every JSON object in `f`, document is None for a
+    value that is not a valid JSON object (or larger than `max_document_size`),
+    reading resumes at the next line starting with `{`. A document is decoded
+    once, after the chunks up to its closing brace are read"""
+    chunk_size = chunk_size or config.STREAM_CHUNK_SIZE
+    max_document_size = max_document_size or config.STREAM_MAX_DOCUMENT_SIZE
+    decoder = json.JSONDecoder()
+    buffer = ""
+    line = 1
+    eof = False
+    while True:
+        start = len(buffer) - len(buffer.lstrip(WHITESPACE))
+        line += buffer.count("\n", 0, start)
+        buffer = buffer[start:]
+        if not buffer:
+            if eof:
+                return
+            buffer = f.read(chunk_size)
+            eof = not buffer
+            continue
+
+        if buffer[0] == "{":
+            end, pos, depth = scan_value(buffer, 0, 0)
+            while end is None and not eof and len(buffer) <= max_document_size:
+                # reads grow with the document, a long one is joined in few steps
+                chunk = f.read(max(chunk_size, len(buffer)))
+                eof = not chunk
+                buffer += chunk
+                end, pos, depth = scan_value(buffer, pos, depth)
+
+            if end is None:
+                error = "too large" if len(buffer) > max_document_size else "cut off"
+            else:
+                try:
+                    document, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError as e:
+                    error = e.msg
+                else:
+                    yield line, document
+                    line += buffer.count("\n", 0, end)
+                    buffer = buffer[end:]
+                    continue
+        else:
+            error = "not an object"
+
+        logging.error(f"line {line}: not a JSON document, {error}")
+        yield line, None
+        while True:
+            match = RESYNC_RE.search(buffer)
+            if match is not None:
+                line += buffer.count("\n", 0, match.end())
+                buffer = buffer[match.end() :]
+                break
+            if eof:
+                buffer = ""
+                break
+            # keep a trailing newline, the next chunk may start with `{`
+            line += buffer.count("\n", 0, len(buffer) - 1)
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[-1] + chunk
+
+
+def read_into(
+    f: TextIO, documents: queue.Queue, stop: threading.Event, errors: List[Exception]
+) -> None:
+    """reader thread, blocks while the queue is full. An error reading `f`
+    (bad encoding, io error) ends the stream and is put into `errors`"""
+    try:
+        for item in iter_documents(f):
+            while not stop.is_set():
+                try:
+                    documents.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+
+    except Exception as e:
+        errors.append(e)
+
+    finally:
+        documents.put(_END)
+
+
+def build_stream(
+    f: TextIO,
+    prefix: str,
+    jobs: int = config.BATCH_JOBS,
+    config_overrides: Optional[dict] = None,
+) -> StreamSummary:
+    """build every document of `f` on a pool of `jobs` processes"""
+    documents: queue.Queue = queue.Queue(maxsize=jobs * config.STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    read_errors: List[Exception] = []
+    reader = threading.Thread(
+        target=read_into, args=(f, documents, stop, read_errors), daemon=True
+    )
+    reader.start()
+
+    count = built = cached = failed = invalid = 0
+    running: Dict[Future, Tuple[str, str]] = {}
+    reading = True
+    try:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=batch.init_worker, initargs=(config_overrides,)
+        ) as executor:
+            while reading or running:
+                # one document per free worker, the rest waits in the bounded queue
+                while reading and len(running) < jobs:
+                    item = documents.get()
+                    if item is _END:
+                        reading = False
+                        break
+
+                    line, data = item
+                    count += 1
+                    if data is None:
+                        invalid += 1
+                        continue
+
+                    label = f"{getattr(f, 'name', '<stream>')}:{line}"
+                    output_filename = f"{prefix}-{count}"
+                    future = executor.submit(batch.run_job, label, output_filename, data)
+                    running[future] = (label, output_filename)
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = batch.collect_result(future, *running.pop(future))
+                    built += result.ok
+                    cached += result.cached
+                    failed += not result.ok
+    finally:
+        stop.set()
+
+    read_error = None
+    if read_errors:
+        read_error = f"{type(read_errors[0]).__name__}: {read_errors[0]}"
+        logging.error(f"could not read the stream after document {count}: {read_error}")
+
+    logging.info(
+        f"stream finished: {count} documents, {built} built ({cached} from cache), "
+        f"{failed} failed, {invalid} not valid JSON"
+    )
+    return StreamSummary(count, built, cached, failed, invalid, read_error)
+
+
+def open_stream(path: str) -> TextIO:
+    if path == "-":
+        return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
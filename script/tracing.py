@@ -0,0 +1,82 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import List, Union
+
+import config
+
+# completed spans as chrome trace events ("X" complete events)
+events: List[dict] = []
+
+_null_span = contextlib.nullcontext()
+
+
+class Span:
+    __slots__ = ("name", "args", "wall_start", "start")
+
+    def __init__(self, name: str, args: dict) -> None:
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "Span":
+        self.wall_start = time.time_ns()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        duration = time.perf_counter_ns() - self.start
+        events.append(
+            {
+                "name": self.name,
+                "ph": "X",
+                "ts": self.wall_start / 1000,
+                "dur": duration / 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": self.args,
+            }
+        )
+
+
+def enabled() -> bool:
+    return bool(config.TRACE_PATH)
+
+
+def span(name: str, **args):
+    """context manager timing a stage, a shared no-op when tracing is off"""
+    if not config.TRACE_PATH:
+        return _null_span
+    return Span(name, args)
+
+
+def drain() -> List[dict]:
+    """remove and return the recorded events, used to ship worker events to the parent"""
+    drained = events[:]
+    del events[: len(drained)]
+    return drained
+
+
+def export_chrome(path: Union[str, Path]) -> None:
+    """write the recorded spans as chrome trace-event json (chrome://tracing, perfetto)"""
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def summary() -> str:
+    """table of count, total, mean and max duration per span name"""
+    durations = defaultdict(list)
+    for event in events:
+        durations[event["name"]].append(event["dur"] / 1000)
+
+    rows = [f"{'span':<28}{'count':>8}{'total ms':>12}{'mean ms':>12}{'max ms':>12}"]
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        rows.append(
+            f"{name:<28}{len(values):>8}{sum(values):>12.2f}"
+            f"{sum(values) / len(values):>12.2f}{max(values):>12.2f}"
+        )
+
+    return "\n".join(rows)
@@ -0,0 +1,178 @@
+"""tailored resumes from one master document
+
+A variant spec (JSONC) describes views of the master resume:
+
+    {
+      "variants": {
+        "ml": {
+          "meta": {"main_color": "MaterialIndigo", "order": ["project", "experience"]},
+          "select": {"work": ["machine learning", "python"], "projects": ["nlp"]},
+          "template": "colorstrip"
+        },
+        "backend": {"select": {"work": ["api", "docker"]}}
+      }
+    }
+
+`meta` is merged over the master's meta, `select` keeps the entries of a
+section whose text contains any of the keywords (all words of a multi word
+keyword), `template` defaults to config.TEMPLATE_DIR.
+
+The master is parsed and indexed once, variants are shallow views sharing the
+master's entry dicts, so an entry used by several variants is rendered once
+through the fragment cache. Compiles run on a thread pool while the next
+variant is rendered.
+"""
+import logging
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+import config
+import create
+import jsonc
+from resume import model
+
+WORD_RE = re.compile(r"\w+")
+# variant names end up in output file names, no separators or leading dots
+VARIANT_NAME_RE = re.compile(r"^\w[\w.-]*$")
+# meta keys of the spec and the key of the normalised meta they set
+META_KEYS = {
+    "main_color": "main_color",
+    "sec_color": "sec_color",
+    "secn_color": "sec_color",
+    "order": "order",
+}
+
+
+class Variant(NamedTuple):
+    name: str
+    meta: dict
+    select: Dict[str, List[str]]
+    template: Optional[str] = None
+
+
+def check_options(name: str, options) -> None:
+    """raises ValueError unless `options` has the shape of a variant"""
+    if not isinstance(options, dict):
+        raise ValueError(f"variant {name!r} must be an object")
+    select = options.get("select", {})
+    if not isinstance(select, dict):
+        raise ValueError(f"variant {name!r}: select must be an object of keyword lists")
+    for section, keywords in select.items():
+        if not isinstance(keywords, list) or not all(isinstance(word, str) for word in keywords):
+            raise ValueError(f"variant {name!r}: select.{section} must be a list of strings")
+    if not isinstance(options.get("template", ""), str):
+        raise ValueError(f"variant {name!r}: template must be a string")
+
+
+def load_spec(path: Path) -> List[Variant]:
+    with open(path, "r") as f:
+        spec = jsonc.load(f)
+
+    variants_spec = spec.get("variants", {}) if isinstance(spec, dict) else None
+    if not isinstance(variants_spec, dict):
+        raise ValueError("a variant spec is an object with an object of variants")
+
+    variants = []
+    for name, options in variants_spec.items():
+        if not VARIANT_NAME_RE.match(name):
+            raise ValueError(f"variant name {name!r} may only contain letters, digits, . - _")
+        check_options(name, options)
+        unknown = set(options.get("select", {})) - set(create.section_data_keys.values())
+        if unknown:
+            raise ValueError(f"variant {name!r} selects unknown sections {sorted(unknown)}")
+        try:
+            meta = model.validate_meta(options.get("meta"))
+        except model.ValidationError as e:
+            raise ValueError(f"variant {name!r}: {e}")
+
+        # normalised values of only the keys the variant sets, `secn_color` as `sec_color`
+        meta_dict = model.to_plain(meta)
+        overrides = {
+            META_KEYS[key]: meta_dict[META_KEYS[key]]
+            for key in (options.get("meta") or {})
+            if key in META_KEYS
+        }
+
+        variants.append(
+            Variant(
+                name,
+                meta=overrides,
+                select=options.get("select", {}),
+                template=options.get("template"),
+            )
+        )
+
+    return variants
+
+
+def words(value) -> FrozenSet[str]:
+    """lowercase words of every string in a (nested) entry"""
+    if isinstance(value, str):
+        return frozenset(word.lower() for word in WORD_RE.findall(value))
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, list):
+        return frozenset().union(*map(words, value))
+    return frozenset()
+
+
+class MasterIndex:
+    """word sets of every entry of the selectable sections, built once"""
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+        self.entry_words: Dict[str, List[FrozenSet[str]]] = {
+            key: [words(entry) for entry in data.get(key) or []]
+            for key in create.section_data_keys.values()
+        }
+
+    def select(self, key: str, keywords: List[str]) -> List[dict]:
+        """entries of section `key` matching any keyword, in master order"""
+        wanted = [frozenset(word.lower() for word in WORD_RE.findall(k)) for k in keywords]
+        return [
+            self.data[key][idx]
+            for idx, entry_words in enumerate(self.entry_words[key])
+            if any(keyword <= entry_words for keyword in wanted)
+        ]
+
+    def view(self, variant: Variant) -> dict:
+        """shallow copy of the master with the variant's meta and selections"""
+        view = dict(self.data)
+        view["meta"] = {**(self.data.get("meta") or {}), **variant.meta}
+        for key, keywords in variant.select.items():
+            view[key] = self.select(key, keywords)
+
+        return view
+
+
+def build_variants(
+    master_path: Path, spec_path: Path, output_filename: str, jobs: int = config.BATCH_JOBS
+) -> Dict[str, create.BuildResult]:
+    """build every variant of the spec as <output_filename>-<variant>.pdf,
+    returns the build result of each variant"""
+    variants = load_spec(spec_path)
+    templates = create.template_dirs()
+    default_template = create.template_name(config.TEMPLATE_DIR)
+    for variant in variants:
+        if (variant.template or default_template) not in templates:
+            raise ValueError(f"variant {variant.name!r} uses unknown template {variant.template!r}")
+
+    index = MasterIndex(create.load_resume(master_path))
+
+    futures: Dict[str, Future] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(variants)))) as executor:
+        for variant in variants:
+            meta_text, content_text = create.render_resume(index.view(variant))
+            logging.info(f"rendered variant {variant.name}")
+
+            futures[variant.name] = executor.submit(
+                create.compile_tex_file,
+                content_text,
+                meta_text,
+                f"{output_filename}-{variant.name}",
+                templates[variant.template or default_template],
+            )
+
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,172 @@
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import config
+import create
+import latexmk
+import staging
+
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """write `text` to `path` only if the bytes differ, so latexmk sees
+    unchanged files as unchanged"""
+    data = text.encode("utf-8")
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    path.write_bytes(data)
+    return True
+
+
+def fingerprint(value) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class WatchBuilder:
+    """keeps a persistent build directory for one resume and re-renders only
+    the sections whose source data changed since the last build"""
+
+    def __init__(self, path: Path, output_filename: str, template_dir: Path) -> None:
+        self.path = Path(path)
+        self.output_filename = output_filename
+        self.template_dir = Path(template_dir)
+        self.build_dir = config.WATCH_BUILD_DIR.joinpath(output_filename)
+        self.fragments: Dict[object, Tuple[str, str]] = {}  # key -> (fingerprint, text)
+
+    def render(self, key, source, render_fn) -> str:
+        source_fingerprint = fingerprint(source)
+        cached = self.fragments.get(key)
+        if cached and cached[0] == source_fingerprint:
+            return cached[1]
+
+        text = render_fn()
+        self.fragments[key] = (source_fingerprint, text)
+        logging.info(f"rendered {key}")
+        return text
+
+    def render_resume(self, data: dict) -> Tuple[str, str]:
+        meta_text = self.render(
+            "meta",
+            (data.get("basics"), data.get("meta")),
+            lambda: create.create_metadata(data),
+        )
+
+        content_text = ""
+        for idx, section_type in enumerate(create.get_order(data)):
+            source = data.get(create.section_data_keys.get(section_type))
+            content_text += self.render(
+                (idx, section_type.name),
+                source,
+                lambda: create.get_section_text(section_type, data),
+            )
+
+        return meta_text, content_text
+
+    def stage(self, meta_text: str, content_text: str) -> bool:
+        """sync the generated and template files into the build directory,
+        returns True if anything was written"""
+        self.build_dir.mkdir(parents=True, exist_ok=True)
+        changed = False
+        for name in ("macros.tex", "resume.tex"):
+            template_text = self.template_dir.joinpath(name).read_text()
+            changed |= write_if_changed(self.build_dir.joinpath(name), template_text)
+
+        changed |= write_if_changed(self.build_dir.joinpath("meta.tex"), meta_text)
+        changed |= write_if_changed(self.build_dir.joinpath("content.tex"), content_text)
+
+        staged_dir = self.build_dir.joinpath("assets")
+        missing = [
+            item
+            for item in staging.required_assets(self.template_dir, meta_text)
+            if not staged_dir.joinpath(item).exists()
+        ]
+        if missing:
+            staging.stage_assets(missing, self.build_dir)
+            changed = True
+
+        return changed
+
+    def compile(self) -> bool:
+        try:
+            result = latexmk.run_latexmk(self.build_dir)
+        except OSError as e:
+            logging.error(f"could not run latexmk: {e}")
+            return False
+
+        if not result.ok:
+            for error in result.errors:
+                logging.error(str(error))
+            logging.error(f"latexmk failed, see {self.build_dir.joinpath('resume.log')}")
+            return False
+
+        # copied, latexmk rewrites resume.pdf of the build directory in place
+        staging.publish(
+            self.build_dir.joinpath("resume.pdf"),
+            config.OUT_DIR.joinpath(f"{self.output_filename}.pdf"),
+            link=False,
+        )
+        return True
+
+    def build(self) -> bool:
+        started = time.perf_counter()
+        try:
+            data = create.load_resume(self.path)
+            meta_text, content_text = self.render_resume(data)
+
+        except Exception as e:
+            logging.error(f"could not render {self.path}: {e!r}")
+            return False
+
+        changed = self.stage(meta_text, content_text)
+        if not changed and self.build_dir.joinpath("resume.pdf").exists():
+            logging.info("no changes in generated files, skipping latexmk")
+            return True
+
+        ok = self.compile()
+        if ok:
+            elapsed = time.perf_counter() - started
+            logging.info(f"built {self.output_filename}.pdf in {elapsed:.2f}s")
+
+        return ok
+
+
+def snapshot(paths) -> Dict[str, Optional[int]]:
+    """mtimes of the watched files"""
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[str(path)] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtimes[str(path)] = None
+
+    return mtimes
+
+
+def watch(path: Path, output_filename: str, template_dir: Path = None) -> None:
+    """rebuild `path` whenever it or the template directory changes"""
+    template_dir = Path(template_dir or config.TEMPLATE_DIR)
+    builder = WatchBuilder(path, output_filename, template_dir)
+
+    def watched_paths():
+        return [Path(path), *sorted(item for item in template_dir.rglob("*") if item.is_file())]
+
+    last = snapshot(watched_paths())
+    builder.build()
+    logging.info(f"watching {path} and {template_dir}, press Ctrl+C to stop")
+
+    try:
+        while True:
+            time.sleep(config.WATCH_INTERVAL)
+            current = snapshot(watched_paths())
+            if current != last:
+                last = current
+                builder.build()
+
+    except KeyboardInterrupt:
+        logging.info("stopped watching")
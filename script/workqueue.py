@@ -0,0 +1,303 @@
+"""resumable batch builds, shareable by several machines
+
+A queue directory (`config.QUEUE_DIR`, on a shared filesystem for several
+nodes) holds
+
+    journal-<host>.jsonl   append-only, one record per finished job
+    claims/<job>.claim     the job is being built by the node named inside
+
+A job is a resume file, named by its path relative to the batch root, and the
+sha256 of its bytes. It is done once any journal has an `ok` record for that
+name and hash, so a restarted run skips it and an edited file is built again,
+wherever the batch directory is mounted. Failed jobs are retried by the next
+run, not by the run that saw them fail.
+
+Jobs are claimed by creating the claim file with O_EXCL, only one node can
+succeed. A node is a process, the owner touches its claims every `lease / 3`
+seconds, a claim not touched for `lease` seconds belongs to a dead node and is
+renamed away and claimed again (right away if the dead node was a process on
+this host). The processes of a host append to one journal under an flock, so
+the number of journals stays at the number of hosts however many runs there
+were and no file is written from two machines. A record is fsync-ed before its
+claim is released. A job is built once unless a live node stalls for longer
+than the lease.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+import batch
+import config
+
+
+class Job(NamedTuple):
+    path: Path
+    key: str  # path relative to the batch root
+    input_hash: str
+
+    @property
+    def claim_name(self) -> str:
+        return hashlib.sha1(self.key.encode("utf-8")).hexdigest() + ".claim"
+
+
+def make_job(path: Path, root: Union[str, Path]) -> Job:
+    key = Path(os.path.relpath(path, root)).as_posix()
+    return Job(path, key, hashlib.sha256(path.read_bytes()).hexdigest())
+
+
+class Journal:
+    """finished jobs of every node, read incrementally from the journal files"""
+
+    def __init__(self, queue_dir: Path, host: str) -> None:
+        self.queue_dir = queue_dir
+        self.path = queue_dir.joinpath(f"journal-{host}.jsonl")
+        self.offsets: Dict[Path, int] = {}
+        self.ok: Set[Tuple[str, str]] = set()
+        self.failed: Counter = Counter()
+        self.file = None
+
+    def refresh(self) -> None:
+        for path in sorted(self.queue_dir.glob("journal-*.jsonl")):
+            with open(path, "rb") as f:
+                f.seek(self.offsets.get(path, 0))
+                data = f.read()
+
+            # a line without newline is still being written, or its node crashed
+            end = data.rfind(b"\n") + 1
+            self.offsets[path] = self.offsets.get(path, 0) + end
+            for line in data[:end].splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                job = (record["path"], record["hash"])
+                if record["ok"]:
+                    self.ok.add(job)
+                else:
+                    self.failed[job] += 1
+
+    def append(self, record: dict) -> None:
+        """append `record` while holding the journal's flock, shared by the
+        processes of this host"""
+        if self.file is None:
+            self.file = open(self.path, "ab+")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        try:
+            line = json.dumps(record).encode("utf-8") + b"\n"
+            end = self.file.seek(0, os.SEEK_END)
+            if end:
+                self.file.seek(end - 1)
+                if self.file.read(1) != b"\n":  # a process died mid record
+                    line = b"\n" + line
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        finally:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class WorkQueue:
+    def __init__(self, queue_dir: Path, lease: float, node: Optional[str] = None) -> None:
+        self.queue_dir = Path(queue_dir)
+        self.claims_dir = self.queue_dir.joinpath("claims")
+        self.claims_dir.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self.node = node or f"{socket.gethostname()}-{os.getpid()}"
+        self.journal = Journal(self.queue_dir, self.node.rpartition("-")[0] or self.node)
+        self.journal.refresh()
+        # failures seen at start are retried, new ones end the job for this run
+        self.failed_before = Counter(self.journal.failed)
+        self.held: Set[Path] = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def finished(self, job: Job) -> bool:
+        entry = (job.key, job.input_hash)
+        return entry in self.journal.ok or (
+            self.journal.failed[entry] > self.failed_before[entry]
+        )
+
+    def claim(self, job: Job) -> bool:
+        path = self.claims_dir.joinpath(job.claim_name)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if not self.reclaim(path):
+                return False
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:  # another node reclaimed it first
+                return False
+
+        with os.fdopen(fd, "w") as f:
+            json.dump({"node": self.node, "path": job.key, "time": time.time()}, f)
+
+        with self.lock:
+            self.held.add(path)
+
+        # the job may have been finished by a node that released it since the last refresh
+        self.journal.refresh()
+        if self.finished(job):
+            self.release(job)
+            return False
+
+        return True
+
+    def expired(self, path: Path) -> bool:
+        """the lease of the claim at `path` ran out, or its node was a process
+        on this host that is gone (a restarted run need not wait for the lease)"""
+        if time.time() - path.stat().st_mtime >= self.lease:
+            return True
+
+        try:
+            owner = json.loads(path.read_text())["node"]
+        except (ValueError, KeyError):  # still being written
+            return False
+        host, _, pid = owner.rpartition("-")
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def reclaim(self, path: Path) -> bool:
+        """remove the claim at `path` if it expired"""
+        try:
+            if not self.expired(path):
+                return False
+        except FileNotFoundError:
+            return True
+
+        stale_path = path.with_name(f"{path.name}.stale-{self.node}")
+        try:
+            os.rename(path, stale_path)
+        except FileNotFoundError:  # released or reclaimed meanwhile
+            return True
+
+        # between the stat and the rename another node may have reclaimed it,
+        # then the renamed claim is fresh and goes back
+        if not self.expired(stale_path):
+            try:
+                os.link(stale_path, path)
+            except FileExistsError:
+                pass
+            stale_path.unlink()
+            return False
+
+        stale_path.unlink()
+        logging.warning(f"reclaimed expired claim {path.name}")
+        return True
+
+    def release(self, job: Job) -> None:
+        path = self.claims_dir.joinpath(job.claim_name)
+        with self.lock:
+            self.held.discard(path)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def record(self, job: Job, result: batch.JobResult) -> None:
+        self.journal.append(
+            {
+                "path": job.key,
+                "hash": job.input_hash,
+                "ok": result.ok,
+                "output": result.output_filename,
+                "node": self.node,
+                "time": time.time(),
+                "log": result.log_path,
+                "errors": result.errors,
+            }
+        )
+
+    def heartbeat(self) -> None:
+        while not self.stopped.wait(self.lease / 3):
+            with self.lock:
+                held = list(self.held)
+            for path in held:
+                try:
+                    os.utime(path)
+                except FileNotFoundError:
+                    logging.warning(f"lost claim {path.name}, another node took it over")
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.journal.close()
+
+
+def drain(
+    paths: List[Path],
+    jobs: int = config.BATCH_JOBS,
+    config_overrides: Optional[dict] = None,
+    queue_dir: Path = config.QUEUE_DIR,
+    lease: float = config.QUEUE_LEASE,
+    root: Union[str, Path, None] = None,
+) -> List[batch.JobResult]:
+    """build the jobs of `paths` not finished yet, together with any other node
+    draining the same queue directory, returns the results of this node's jobs"""
+    root = batch.common_root(paths) if root is None else root
+    output_filenames = batch.get_output_filenames(paths, root)
+    queue = WorkQueue(queue_dir, lease)
+    pending = [make_job(path, root) for path in paths]
+    skipped = sum(1 for job in pending if queue.finished(job))
+    pending = [job for job in pending if not queue.finished(job)]
+    logging.info(f"queue {queue_dir}: {len(pending)} jobs to build, {skipped} already done")
+
+    heartbeat = threading.Thread(target=queue.heartbeat, daemon=True)
+    heartbeat.start()
+    results = []
+    running: Dict[Future, Job] = {}
+    try:
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=batch.init_worker, initargs=(config_overrides,)
+        ) as executor:
+            while pending or running:
+                queue.journal.refresh()
+                pending = [job for job in pending if not queue.finished(job)]
+                for job in list(pending):
+                    if len(running) >= jobs:
+                        break
+                    if queue.claim(job):
+                        pending.remove(job)
+                        output_filename = output_filenames[job.path]
+                        future = executor.submit(batch.run_job, job.path, output_filename)
+                        running[future] = job
+
+                if not running:
+                    if pending:  # claimed by other nodes, wait for them or their lease
+                        time.sleep(config.QUEUE_POLL_INTERVAL)
+                    continue
+
+                done, _ = wait(
+                    running, timeout=config.QUEUE_POLL_INTERVAL, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    job = running.pop(future)
+                    result = batch.collect_result(future, job.path, output_filenames[job.path])
+                    queue.record(job, result)
+                    queue.release(job)
+                    results.append(result)
+    finally:
+        queue.close()
+
+    batch.log_summary(results, skipped)
+    return results